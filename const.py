@@ -28,6 +28,8 @@ CONF_UNIT = "unit"
 CONF_REMOTE_ID = "remote_id"
 CONF_TRAVELLING_TIME_DOWN = 'travelling_time_down'
 CONF_TRAVELLING_TIME_UP = 'travelling_time_up'
+CONF_TRAVELLING_CURVE = 'travelling_curve'
+CONF_TRAVELLING_START_DELAY = 'travelling_start_delay'
 CONF_INTERMEDIATE_DISABLE = 'intermediate_position_disable'         # deprecated
 CONF_INTERMEDIATE_POSITION = 'intermediate_position'
 CONF_INTERMEDIATE_POSITION_UP = 'intermediate_position_up'
@@ -35,15 +37,43 @@ CONF_INTERMEDIATE_POSITION_DOWN = 'intermediate_position_down'
 CONF_TILT_INTERMEDIATE = 'tilt_intermediate'
 CONF_TILT_BLIND = 'tilt_blind'
 CONF_TILT_TIME_BLIND = 'tilt_time_blind'
+CONF_RETRANSMIT = 'retransmit'
+CONF_RETRANSMIT_COMMANDS = 'retransmit_commands'
+CONF_PROGRESS_INTERVAL = 'progress_interval'
+CONF_COALESCE_EVENTS = 'coalesce_events'
+CONF_DEDUP_WINDOW = 'dedup_window'
+CONF_SHARDS = 'shards'
+CONF_DUTY_CYCLE = 'duty_cycle'
+CONF_SENDER_FILTER = 'sender_filter'
+CONF_CHANNELS = 'channels'
+CONF_GAP = 'gap'
+CONF_RESTART = 'restart'
 
 TILT_FUNCTIONALITY = 'tilt_functionality'
 
+# Packets of senders unknown to all covers are dropped or only fire events
+SENDER_FILTER_DROP = 'drop'
+SENDER_FILTER_EVENTS = 'events'
+ATTR_TRAVEL = 'travel'
+
 CLOSED_POSITION = 0
 VENTILATION_POSITION = 25
 INTERMEDIATE_POSITION = 75
 OPEN_POSITION = 100
 TILT_TIME = 0.3
 TILT_RECEIVE_TIMEOUT = 1.0
+MIN_PROGRESS_INTERVAL = 0.2
+TIMER_RESOLUTION = 0.05
+RETRANSMIT_INTERVAL = 2.0
+RETRANSMIT_JITTER = 0.25  # share of the interval
+MAX_RETRANSMIT = 5
+
+# cover command: pybecker command and position confirming the command
+RETRANSMIT_COMMANDS = {
+    'open': ('UP', OPEN_POSITION),
+    'close': ('DOWN', CLOSED_POSITION),
+    'stop': ('HALT', None),
+}
 
 COMMANDS = {
     'halt': f'{COMMAND_HALT:02x}'.encode(),
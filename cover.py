@@ -1,7 +1,14 @@
 """Support for Becker RF covers."""
 
+import asyncio
+from datetime import timedelta
+import heapq
+from itertools import count
 import logging
+import math
+import random
 import time
+from types import MappingProxyType
 
 import voluptuous as vol
 
@@ -17,54 +24,85 @@ from homeassistant.const import (
     CONF_DEVICE,
     CONF_FILENAME,
     CONF_FRIENDLY_NAME,
+    CONF_NAME,
     CONF_VALUE_TEMPLATE,
+    Platform,
 )
 from homeassistant.core import callback
 from homeassistant.exceptions import TemplateError
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.event import (
     TrackTemplate,
-    async_call_later,
     async_track_template_result,
+    async_track_time_interval,
 )
-from homeassistant.helpers.restore_state import RestoreEntity
+from homeassistant.helpers.restore_state import ExtraStoredData, RestoreEntity, RestoredExtraData
+from homeassistant.helpers.discovery import async_load_platform
 from homeassistant.helpers.dispatcher import async_dispatcher_connect
 
 from .const import (
+    ATTR_TRAVEL,
     CLOSED_POSITION,
     COMMANDS,
     CONF_CHANNEL,
+    CONF_COALESCE_EVENTS,
+    CONF_DEDUP_WINDOW,
+    CONF_DUTY_CYCLE,
     CONF_INTERMEDIATE_DISABLE,
     CONF_INTERMEDIATE_POSITION,
     CONF_INTERMEDIATE_POSITION_DOWN,
     CONF_INTERMEDIATE_POSITION_UP,
+    CONF_PROGRESS_INTERVAL,
     CONF_REMOTE_ID,
+    CONF_RETRANSMIT,
+    CONF_RETRANSMIT_COMMANDS,
+    CONF_SENDER_FILTER,
+    CONF_SHARDS,
     CONF_TILT_BLIND,
     CONF_TILT_INTERMEDIATE,
     CONF_TILT_TIME_BLIND,
+    CONF_TRAVELLING_CURVE,
+    CONF_TRAVELLING_START_DELAY,
     CONF_TRAVELLING_TIME_DOWN,
     CONF_TRAVELLING_TIME_UP,
     DEVICE_CLASS,
     DOMAIN,
     INTERMEDIATE_POSITION,
+    MAX_RETRANSMIT,
+    MIN_PROGRESS_INTERVAL,
     OPEN_POSITION,
-    RECEIVE_MESSAGE,
     REMOTE_ID,
+    RETRANSMIT_COMMANDS,
+    RETRANSMIT_INTERVAL,
+    RETRANSMIT_JITTER,
+    SENDER_FILTER_DROP,
+    SENDER_FILTER_EVENTS,
     TEMPLATE_UNKNOWN_STATES,
     TEMPLATE_VALID_CLOSE,
     TEMPLATE_VALID_OPEN,
     TILT_FUNCTIONALITY,
     TILT_RECEIVE_TIMEOUT,
     TILT_TIME,
+    TIMER_RESOLUTION,
     VENTILATION_POSITION,
 )
+from .pybecker.becker_helper import DEDUP_WINDOW, DUTY_CYCLE, PRIORITY_RETRANSMIT
 from .rf_device import PyBecker
-from .travelcalculator import TravelCalculator
+from .travelcalculator import TravelCalculator, TravelCurve
 
 _LOGGER = logging.getLogger(__name__)
 
 COVER_FEATURES = CoverEntityFeature.OPEN | CoverEntityFeature.CLOSE | CoverEntityFeature.STOP
 
+
+def travel_curve(value):
+    """Validate travel curve and precompute its lookup tables."""
+    try:
+        return TravelCurve(value)
+    except ValueError as err:
+        raise vol.Invalid(str(err)) from err
+
+
 COVER_SCHEMA = vol.Schema(
     {
         vol.Optional(CONF_FRIENDLY_NAME): cv.string,
@@ -73,6 +111,10 @@ COVER_SCHEMA = vol.Schema(
         vol.Optional(CONF_REMOTE_ID): cv.string,
         vol.Optional(CONF_TRAVELLING_TIME_DOWN): cv.positive_float,
         vol.Optional(CONF_TRAVELLING_TIME_UP): cv.positive_float,
+        vol.Optional(CONF_TRAVELLING_CURVE): vol.All(
+            cv.ensure_list, [vol.All(vol.Coerce(float), vol.Range(min=0, max=100))], travel_curve
+        ),
+        vol.Optional(CONF_TRAVELLING_START_DELAY, default=0): cv.positive_float,
         vol.Optional(CONF_INTERMEDIATE_POSITION_UP, default=VENTILATION_POSITION): cv.positive_int,
         vol.Optional(CONF_INTERMEDIATE_POSITION_DOWN, default=INTERMEDIATE_POSITION): cv.positive_int,
         vol.Optional(CONF_INTERMEDIATE_DISABLE): cv.boolean,
@@ -80,6 +122,12 @@ COVER_SCHEMA = vol.Schema(
         vol.Optional(CONF_TILT_INTERMEDIATE): cv.boolean,
         vol.Optional(CONF_TILT_BLIND, default=False): cv.boolean,
         vol.Optional(CONF_TILT_TIME_BLIND, default=TILT_TIME): cv.positive_float,
+        vol.Optional(CONF_RETRANSMIT, default=0): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=MAX_RETRANSMIT)
+        ),
+        vol.Optional(CONF_RETRANSMIT_COMMANDS, default=['open', 'close']): vol.All(
+            cv.ensure_list, [vol.In(RETRANSMIT_COMMANDS)]
+        ),
     }
 )
 
@@ -87,7 +135,20 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
         vol.Required(CONF_COVERS): cv.schema_with_slug_keys(COVER_SCHEMA),
         vol.Optional(CONF_DEVICE): cv.string,
+        vol.Optional(CONF_NAME): cv.string,
         vol.Optional(CONF_FILENAME): cv.string,
+        vol.Optional(CONF_COALESCE_EVENTS, default=False): cv.boolean,
+        vol.Optional(CONF_DEDUP_WINDOW, default=DEDUP_WINDOW): vol.All(
+            vol.Coerce(float), vol.Range(min=0)
+        ),
+        vol.Optional(CONF_SHARDS): {cv.string: vol.All(cv.ensure_list, [cv.string])},
+        vol.Optional(CONF_DUTY_CYCLE, default=DUTY_CYCLE): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=100)
+        ),
+        vol.Optional(CONF_PROGRESS_INTERVAL): vol.All(
+            vol.Coerce(float), vol.Range(min=MIN_PROGRESS_INTERVAL)
+        ),
+        vol.Optional(CONF_SENDER_FILTER): vol.In([SENDER_FILTER_DROP, SENDER_FILTER_EVENTS]),
     }
 )
 
@@ -95,18 +156,45 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
 async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up the becker platform."""
     covers = []
+    senders = set()
     device = config.get(CONF_DEVICE)
     filename = config.get(CONF_FILENAME)
     _LOGGER.debug("%s: %s; %s: %s", CONF_DEVICE, device, CONF_FILENAME, filename)
-    PyBecker.setup(hass, device=device, filename=filename)
+    pybecker = PyBecker.setup(
+        hass, device=device, filename=filename,
+        coalesce_events=config.get(CONF_COALESCE_EVENTS),
+        dedup_window=config.get(CONF_DEDUP_WINDOW),
+        shards=config.get(CONF_SHARDS),
+        duty_cycle=config.get(CONF_DUTY_CYCLE),
+        sender_filter=config.get(CONF_SENDER_FILTER),
+        name=config.get(CONF_NAME),
+    )
+    # Diagnostic sensors for transport metrics, once per device
+    if not pybecker.sensors_loaded:
+        pybecker.sensors_loaded = True
+        hass.async_create_task(
+            async_load_platform(
+                hass, Platform.SENSOR, DOMAIN, {CONF_DEVICE: pybecker.device}, config
+            )
+        )
+    # Shared scheduler for delayed callbacks of all covers
+    scheduler = CoverScheduler(hass)
+    # Optional shared ticker for position updates while travelling
+    progress_interval = config.get(CONF_PROGRESS_INTERVAL)
+    ticker = None
+    if progress_interval is not None:
+        ticker = ProgressTicker(hass, progress_interval)
 
     for device, device_config in config[CONF_COVERS].items():
         friendly_name = device_config.get(CONF_FRIENDLY_NAME, device)
         channel = device_config.get(CONF_CHANNEL)
         state_template = device_config.get(CONF_VALUE_TEMPLATE)
         remote_id = device_config.get(CONF_REMOTE_ID)
+        senders.update(i['id'].upper().encode() for i in REMOTE_ID.finditer(remote_id or ""))
         travel_time_down = device_config.get(CONF_TRAVELLING_TIME_DOWN)
         travel_time_up = device_config.get(CONF_TRAVELLING_TIME_UP)
+        travel_curve = device_config.get(CONF_TRAVELLING_CURVE)
+        travel_start_delay = device_config.get(CONF_TRAVELLING_START_DELAY)
         # Warning if both template and travelling time are set
         if (travel_time_down or travel_time_up) is not None and state_template is not None:
             _LOGGER.warning('Both "%s" and "%s" are configured for cover %s. "%s" might influence with "%s"!',
@@ -156,40 +244,167 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
             )
             tilt_intermediate = False
         tilt_time_blind = device_config.get(CONF_TILT_TIME_BLIND)
+        retransmit = device_config.get(CONF_RETRANSMIT)
+        retransmit_commands = device_config.get(CONF_RETRANSMIT_COMMANDS)
 
         if channel is None:
             _LOGGER.error("Must specify %s", CONF_CHANNEL)
             continue
         # Initialize all missing units in the db file and send stop command for sync
-        await PyBecker.becker.init_unconfigured_unit(channel, name=friendly_name)
+        await pybecker.becker.init_unconfigured_unit(channel, name=friendly_name)
 
         covers.append(
             BeckerEntity(
-                PyBecker.becker, friendly_name, channel,
+                pybecker, scheduler, friendly_name, channel,
                 state_template, remote_id, travel_time_down, travel_time_up,
                 intermediate_pos_up, intermediate_pos_down, intermediate_position,
                 tilt_intermediate, tilt_blind, tilt_time_blind,
+                travel_curve, travel_start_delay, ticker,
+                retransmit, retransmit_commands,
             )
         )
 
+    pybecker.add_senders(senders)
     async_add_entities(covers)
 
 
+class CoverScheduler:
+    """
+    Shared scheduler for delayed callbacks of all covers.
+
+    Deadlines are rounded up to slots of TIMER_RESOLUTION seconds and kept in
+    a heap, which is served by a single loop timer. Scheduling an existing key
+    replaces its deadline in place. All callbacks of the same slot are fired
+    together.
+    """
+
+    def __init__(self, hass):
+        """Init the scheduler."""
+        self._hass = hass
+        self._heap = []
+        self._entries = {}
+        self._sequence = count()
+        self._timer = None
+        self._timer_slot = None
+
+    @callback
+    def async_schedule(self, key, delay, action):
+        """Schedule or reschedule action for key after delay seconds."""
+        slot = math.ceil((self._hass.loop.time() + delay) / TIMER_RESOLUTION)
+        sequence = next(self._sequence)
+        self._entries[key] = (slot, sequence, action)
+        heapq.heappush(self._heap, (slot, sequence, key))
+        # drop outdated heap entries of rescheduled or cancelled keys
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [
+                (slot, sequence, key)
+                for key, (slot, sequence, _) in self._entries.items()
+            ]
+            heapq.heapify(self._heap)
+        self._arm()
+
+    @callback
+    def async_cancel(self, key):
+        """Cancel pending action of key."""
+        self._entries.pop(key, None)
+
+    def is_scheduled(self, key):
+        """Return if an action of key is pending."""
+        return key in self._entries
+
+    def _arm(self):
+        """Setup loop timer for the earliest slot."""
+        if not self._heap:
+            return
+        slot = self._heap[0][0]
+        if self._timer_slot is not None and self._timer_slot <= slot:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer_slot = slot
+        self._timer = self._hass.loop.call_at(
+            slot * TIMER_RESOLUTION, self._async_fire
+        )
+
+    @callback
+    def _async_fire(self):
+        """Run all actions which are due."""
+        self._timer = None
+        self._timer_slot = None
+        current = round(self._hass.loop.time() / TIMER_RESOLUTION)
+        actions = []
+        while self._heap and self._heap[0][0] <= current:
+            _, sequence, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == sequence:
+                del self._entries[key]
+                actions.append(entry[2])
+        self._arm()
+        for action in actions:
+            result = action()
+            if asyncio.iscoroutine(result):
+                self._hass.async_create_task(result)
+
+
+class ProgressTicker:
+    """Shared ticker to update the ha-state of all travelling covers."""
+
+    def __init__(self, hass, interval):
+        """Init the ticker."""
+        self._hass = hass
+        self._interval = timedelta(seconds=interval)
+        self._entities = set()
+        self._unsub = None
+
+    @callback
+    def async_add(self, entity):
+        """Add a travelling cover and start ticking if required."""
+        self._entities.add(entity)
+        if self._unsub is None:
+            _LOGGER.debug("Start progress ticker")
+            self._unsub = async_track_time_interval(
+                self._hass, self._async_tick, self._interval
+            )
+
+    @callback
+    def async_remove(self, entity):
+        """Remove a cover and stop ticking if nothing is travelling."""
+        self._entities.discard(entity)
+        if not self._entities and self._unsub is not None:
+            _LOGGER.debug("Stop progress ticker")
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _async_tick(self, _):
+        """Write ha-state of all travelling covers at once."""
+        for entity in list(self._entities):
+            if entity.is_opening or entity.is_closing:
+                entity.async_write_state_if_changed()
+            else:
+                # final state is written by the entity itself
+                self.async_remove(entity)
+
+
 class BeckerEntity(CoverEntity, RestoreEntity):
     """Representation of a Becker cover entity."""
 
     def __init__(
-        self, becker, name, channel,
+        self, pybecker, scheduler, name, channel,
         state_template, remote_id, travel_time_down, travel_time_up,
         intermediate_pos_up, intermediate_pos_down, intermediate_position,
         tilt_intermediate, tilt_blind, tilt_time_blind,
+        travel_curve=None, travel_start_delay=0, ticker=None,
+        retransmit=0, retransmit_commands=(),
     ):
         """Init the Becker entity."""
-        self._becker = becker
+        self._becker = pybecker.becker
+        self._receive_signal = pybecker.receive_signal
+        self._unique_id = pybecker.unique_prefix + channel
         self._name = name
-        self._attr = dict()
+        attributes = {}
         self._channel = channel
-        self._attr[CONF_CHANNEL] = str(channel)
+        attributes[CONF_CHANNEL] = str(channel)
         self._cover_features = COVER_FEATURES
         # Template
         self._template = state_template
@@ -198,9 +413,9 @@ class BeckerEntity(CoverEntity, RestoreEntity):
         self._intermediate_pos_up = intermediate_pos_up
         self._intermediate_pos_down = intermediate_pos_down
         if intermediate_position:
-            self._attr[CONF_INTERMEDIATE_POSITION] = str(intermediate_position)
-            self._attr[CONF_INTERMEDIATE_POSITION_UP] = str(intermediate_pos_up)
-            self._attr[CONF_INTERMEDIATE_POSITION_DOWN] = str(intermediate_pos_down)
+            attributes[CONF_INTERMEDIATE_POSITION] = str(intermediate_position)
+            attributes[CONF_INTERMEDIATE_POSITION_UP] = str(intermediate_pos_up)
+            attributes[CONF_INTERMEDIATE_POSITION_DOWN] = str(intermediate_pos_down)
         # tilt settings
         self._tilt_intermediate = tilt_intermediate
         self._tilt_blind = tilt_blind
@@ -209,12 +424,17 @@ class BeckerEntity(CoverEntity, RestoreEntity):
         if tilt_intermediate or tilt_blind:
             self._cover_features |= CoverEntityFeature.OPEN_TILT | CoverEntityFeature.CLOSE_TILT
         if tilt_blind:
-            self._attr[TILT_FUNCTIONALITY] = str(CONF_TILT_BLIND)
-            self._attr[CONF_TILT_TIME_BLIND] = str(tilt_time_blind)
+            attributes[TILT_FUNCTIONALITY] = str(CONF_TILT_BLIND)
+            attributes[CONF_TILT_TIME_BLIND] = str(tilt_time_blind)
         if tilt_intermediate:
-            self._attr[TILT_FUNCTIONALITY] = str(CONF_TILT_INTERMEDIATE)
+            attributes[TILT_FUNCTIONALITY] = str(CONF_TILT_INTERMEDIATE)
         # Callbacks
-        self._callbacks = dict()
+        self._scheduler = scheduler
+        self._ticker = ticker
+        # Retransmission of selected commands: (command, remaining, confirming position)
+        self._retransmit = retransmit
+        self._retransmit_commands = set(retransmit_commands) if retransmit else set()
+        self._retransmit_state = None
         # Setup TravelCalculator
         # todo enable set position and self_template
         if not ((travel_time_down or travel_time_up) is None or self._template is not None):
@@ -223,9 +443,13 @@ class BeckerEntity(CoverEntity, RestoreEntity):
         travel_time_down = travel_time_down or travel_time_up or 0
         travel_time_up = travel_time_up or travel_time_down or 0
         if self._cover_features & CoverEntityFeature.SET_POSITION:
-            self._attr[CONF_TRAVELLING_TIME_DOWN] = str(travel_time_down)
-            self._attr[CONF_TRAVELLING_TIME_UP] = str(travel_time_up)
-        self._tc = TravelCalculator(travel_time_down, travel_time_up)
+            attributes[CONF_TRAVELLING_TIME_DOWN] = str(travel_time_down)
+            attributes[CONF_TRAVELLING_TIME_UP] = str(travel_time_up)
+            if travel_start_delay:
+                attributes[CONF_TRAVELLING_START_DELAY] = str(travel_start_delay)
+        self._tc = TravelCalculator(
+            travel_time_down, travel_time_up, travel_curve, travel_start_delay
+        )
         # Setup Remote IDs
         if remote_id is None:
             remote_id = ""
@@ -235,7 +459,13 @@ class BeckerEntity(CoverEntity, RestoreEntity):
             id2 = i['id'].upper() + 'F'             # ALL channels of Multi-Channel-Remote
             self._remode_ids.update([id1.encode(), id2.encode()])
         if len(self._remode_ids) > 0:
-            self._attr[CONF_REMOTE_ID] = b", ".join(self._remode_ids).decode()
+            attributes[CONF_REMOTE_ID] = b", ".join(self._remode_ids).decode()
+        # Static attributes are frozen, dynamic ones are merged on position changes
+        self._static_attr = MappingProxyType(attributes)
+        self._template_result = None
+        self._attr_cache = None
+        self._attr_cache_key = None
+        self._last_written_state = None
 
     async def async_added_to_hass(self):
         """Register callbacks."""
@@ -250,9 +480,15 @@ class BeckerEntity(CoverEntity, RestoreEntity):
         # set closed position as default if still unknown
         if self._tc.current_position() is None:
             self._tc.set_position(100 - CLOSED_POSITION)
+        # continue tracking a travel interrupted by a restart
+        last_extra_data = await self.async_get_last_extra_data()
+        if last_extra_data is not None:
+            travel = last_extra_data.as_dict().get(ATTR_TRAVEL)
+            if travel is not None and self._cover_features & CoverEntityFeature.SET_POSITION:
+                self._restore_travel(*travel)
         # Setup callback on received packets
         receive = async_dispatcher_connect(
-            self.hass, f"{DOMAIN}.{RECEIVE_MESSAGE}", self._async_message_received
+            self.hass, self._receive_signal, self._async_message_received
         )
         self.async_on_remove(receive)
         # Setup callback on template changes
@@ -267,8 +503,11 @@ class BeckerEntity(CoverEntity, RestoreEntity):
 
     async def async_will_remove_from_hass(self):
         """Unsubscribe temporary callbacks."""
-        for callback in self._callbacks:
-            self._callbacks[callback]()
+        self._scheduler.async_cancel((self, 'update_ha'))
+        self._scheduler.async_cancel((self, 'travel_stop'))
+        self._cancel_retransmit()
+        if self._ticker is not None:
+            self._ticker.async_remove(self)
 
     @property
     def name(self):
@@ -277,8 +516,8 @@ class BeckerEntity(CoverEntity, RestoreEntity):
 
     @property
     def unique_id(self):
-        """Return the unique id of the device - the channel."""
-        return self._channel
+        """Return the unique id of the device - the channel, prefixed by the device of additional sticks."""
+        return self._unique_id
 
     @property
     def current_cover_position(self):
@@ -319,9 +558,60 @@ class BeckerEntity(CoverEntity, RestoreEntity):
 
     @property
     def extra_state_attributes(self):
-        """Return the device state attributes."""
-        self._attr[ATTR_POSITION] = self.current_cover_position
-        return self._attr
+        """Return the device state attributes, rebuilt only if the position or template result changed."""
+        key = (self.current_cover_position, self._template_result)
+        if key != self._attr_cache_key:
+            attributes = dict(self._static_attr)
+            attributes[ATTR_POSITION] = key[0]
+            if self._template is not None:
+                attributes[CONF_VALUE_TEMPLATE] = key[1]
+            self._attr_cache = attributes
+            self._attr_cache_key = key
+        return self._attr_cache
+
+    @callback
+    def async_write_state_if_changed(self):
+        """Write ha-state, skipped if nothing moved or changed since the last write."""
+        state = (
+            self.current_cover_position, self.is_opening, self.is_closing, self._template_result
+        )
+        if state == self._last_written_state:
+            return
+        self._last_written_state = state
+        self.async_write_ha_state()
+
+    @property
+    def extra_restore_state_data(self) -> ExtraStoredData | None:
+        """Return the travel in progress to be restored after a restart."""
+        travel = self._tc.travel_state()
+        if travel is None:
+            return None
+        return RestoredExtraData(
+            {ATTR_TRAVEL: [*travel, self._scheduler.is_scheduled((self, 'travel_stop'))]}
+        )
+
+    def _restore_travel(self, start, target, direction, started, timed_stop):
+        """
+        Continue tracking a travel. If the travel has a timed stop which was
+        missed during the restart, the cover travels to its end position.
+        """
+        # In TravelCalculator 0 is open, 100 is closed.
+        remaining = self._tc.calculate_travel_time(start, target) - (time.time() - started)
+        if timed_stop and remaining <= 0:
+            _LOGGER.warning("%s missed the stop at position %s during restart", self.name, 100 - target)
+            target = self._tc.position_closed if target > start else self._tc.position_open
+        self._tc.restore_travel(start, target, direction, started)
+        if not self._tc.is_traveling():
+            _LOGGER.debug("%s finished travel to %s during restart", self.name, self.current_cover_position)
+            return
+        travel_time = self._tc.calculate_travel_time(self._tc.current_position(), target)
+        _LOGGER.debug(
+            "%s continues travel to position %s in %s seconds",
+            self.name, 100 - target, travel_time,
+        )
+        self._update_scheduled_ha_state_callback(travel_time)
+        if timed_stop:
+            self._update_scheduled_stop_travel_callback(remaining)
 
     @property
     def should_poll(self):
@@ -335,12 +625,14 @@ class BeckerEntity(CoverEntity, RestoreEntity):
         """Set the cover to the open position."""
         self._travel_to_position(OPEN_POSITION)
         await self._becker.move_up(self._channel)
+        self._start_retransmit('open')
 
     async def async_open_cover_tilt(self, **kwargs):
         """Open the cover tilt."""
         # Feature only available if SUPPORT_OPEN_TILT is set
         if self._tilt_blind:
             await self.async_open_cover()
+            self._cancel_retransmit()
             self._update_scheduled_stop_travel_callback(self._tilt_time_blind)
         if self._tilt_intermediate:
             self._travel_to_position(self._intermediate_pos_up)
@@ -350,12 +642,14 @@ class BeckerEntity(CoverEntity, RestoreEntity):
         """Set the cover to the closed position."""
         self._travel_to_position(CLOSED_POSITION)
         await self._becker.move_down(self._channel)
+        self._start_retransmit('close')
 
     async def async_close_cover_tilt(self, **kwargs):
         """Close the cover tilt."""
         # Feature only available if SUPPORT_CLOSE_TILT is set
         if self._tilt_blind:
             await self.async_close_cover()
+            self._cancel_retransmit()
             self._update_scheduled_stop_travel_callback(self._tilt_time_blind)
         if self._tilt_intermediate:
             self._travel_to_position(self._intermediate_pos_down)
@@ -365,25 +659,48 @@ class BeckerEntity(CoverEntity, RestoreEntity):
         """Set the cover to the stopped position."""
         self._travel_stop()
         await self._becker.stop(self._channel)
+        self._start_retransmit('stop')
 
     async def async_set_cover_position(self, **kwargs):
         """Move the cover to a specific position."""
         # Feature only available if SUPPORT_SET_POSITION is set
         if ATTR_POSITION in kwargs:
             pos = kwargs[ATTR_POSITION]
+            command, timed_stop = self._plan_position(pos)
+            if command is None:
+                return
             travel_time = self._travel_to_position(pos)
-            if self._tc.is_closing():
-                await self._becker.move_down(self._channel)
-            elif self._tc.is_opening():
-                await self._becker.move_up(self._channel)
-            if 0 < pos < 100:
-                self._update_scheduled_stop_travel_callback(travel_time)
+            await command(self._channel)
+            # a pending stop of a previous move is replaced or cancelled
+            self._update_scheduled_stop_travel_callback(travel_time if timed_stop else None)
+
+    def _plan_position(self, position):
+        """
+        Return the becker command to reach position and if a timed stop is required.
+
+        End positions and the hardware intermediate positions are reached by a
+        single frame, the cover stops by itself. Other positions require a
+        timed stop. The command is None if the cover is already at position.
+        """
+        current = self.current_cover_position
+        if position == current:
+            if self.is_opening or self.is_closing:
+                return self._becker.stop, False
+            return None, False
+        if self._intermediate_position:
+            if position == self._intermediate_pos_up and current < position:
+                return self._becker.move_up_intermediate, False
+            if position == self._intermediate_pos_down and current > position:
+                return self._becker.move_down_intermediate, False
+        command = self._becker.move_up if position > current else self._becker.move_down
+        return command, CLOSED_POSITION < position < OPEN_POSITION
 
     def _travel_to_position(self, position):
         """Start TravelCalculator and update ha-state."""
-        # In TravelCalculator 0 is open, 100 is closed. Swap from_ and to_ position
+        self._cancel_retransmit()
+        # In TravelCalculator 0 is open, 100 is closed.
         travel_time = self._tc.calculate_travel_time(
-            position, self.current_cover_position
+            100 - self.current_cover_position, 100 - position
         )
         if self._template is None:
             _LOGGER.debug(
@@ -396,6 +713,7 @@ class BeckerEntity(CoverEntity, RestoreEntity):
 
     def _travel_stop(self):
         """Stop TravelCalculator and update ha-state."""
+        self._cancel_retransmit()
         self._tc.stop()
         if not (self._cover_features & CoverEntityFeature.SET_POSITION) and self._template is None:
             self._tc.set_position(50)
@@ -409,22 +727,26 @@ class BeckerEntity(CoverEntity, RestoreEntity):
         0:    update now
         > 0:  update now and setup callback after delay later.
         """  # noqa: D205, D212
-        # unsubscribe outdated pending callbacks
-        self._callbacks.pop('update_ha', lambda: None)()
         # Schedule callback to update ha-state at end of travel
+        if delay is None or delay <= 0:
+            # unsubscribe outdated pending callbacks
+            self._scheduler.async_cancel((self, 'update_ha'))
         if delay is not None:
             # Update ha-state immediately
             _LOGGER.debug("%s update ha-state now", self._name)
-            self.async_schedule_update_ha_state()
-            # Schedule update ha-state later
+            self.async_write_state_if_changed()
+            # Schedule update ha-state later, replaces pending callback
             if delay > 0:
                 _LOGGER.debug(
                     "%s setup update ha-state callback in %s seconds",
                     self.name, delay,
                 )
-                self._callbacks['update_ha'] = async_call_later(
-                    self.hass, delay, self._async_update_ha_state
+                self._scheduler.async_schedule(
+                    (self, 'update_ha'), delay, self._async_update_ha_state
                 )
+                # Report position progress until end of travel
+                if self._ticker is not None:
+                    self._ticker.async_add(self)
 
     def _update_scheduled_stop_travel_callback(self, delay=None):
         """
@@ -432,19 +754,53 @@ class BeckerEntity(CoverEntity, RestoreEntity):
         None: unsubscibe pending callback
         >= 0: setup callback stop after delay later
         """
-        # unsubscribe outdated pending callbacks
-        self._callbacks.pop('travel_stop', lambda: None)()
         # schedule callback to stop travelling at end of travel
-        if delay is not None:
-            # Stop now or later
-            if delay >= 0:
-                _LOGGER.debug(
-                    "%s setup stop travel callback in %s seconds",
-                    self.name, delay,
-                )
-                self._callbacks['travel_stop'] = async_call_later(
-                    self.hass, delay, self._async_stop_travel
-                )
+        if delay is not None and delay >= 0:
+            # Stop now or later, replaces pending callback
+            _LOGGER.debug(
+                "%s setup stop travel callback in %s seconds",
+                self.name, delay,
+            )
+            self._scheduler.async_schedule(
+                (self, 'travel_stop'), delay, self._async_stop_travel
+            )
+        else:
+            # unsubscribe outdated pending callbacks
+            self._scheduler.async_cancel((self, 'travel_stop'))
+
+    def _start_retransmit(self, command):
+        """Setup retransmission of a cover command, if enabled for the command."""
+        if command not in self._retransmit_commands:
+            return
+        cmd, position = RETRANSMIT_COMMANDS[command]
+        self._retransmit_state = (cmd, self._retransmit, position)
+        self._schedule_retransmit()
+
+    def _schedule_retransmit(self):
+        """Schedule next retransmission, the jitter avoids collisions of several covers."""
+        delay = RETRANSMIT_INTERVAL * (1 + random.uniform(-RETRANSMIT_JITTER, RETRANSMIT_JITTER))
+        self._scheduler.async_schedule((self, 'retransmit'), delay, self._async_retransmit)
+
+    def _cancel_retransmit(self):
+        """Cancel pending retransmissions."""
+        if self._retransmit_state is not None:
+            self._retransmit_state = None
+            self._scheduler.async_cancel((self, 'retransmit'))
+
+    @callback
+    async def _async_retransmit(self):
+        """Repeat the command with a new increment."""
+        if self._retransmit_state is None:
+            return
+        cmd, remaining, position = self._retransmit_state
+        remaining -= 1
+        _LOGGER.debug("%s retransmit %s, %s retransmissions left", self.name, cmd, remaining)
+        if remaining > 0:
+            self._retransmit_state = (cmd, remaining, position)
+            self._schedule_retransmit()
+        else:
+            self._retransmit_state = None
+        await self._becker.send(self._channel, cmd, priority=PRIORITY_RETRANSMIT)
 
     @callback
     async def _async_message_received(self, packet):
@@ -473,13 +829,13 @@ class BeckerEntity(CoverEntity, RestoreEntity):
                 self._tilt_timeout = time.time() + TILT_RECEIVE_TIMEOUT
 
     @callback
-    async def _async_stop_travel(self, _):
+    async def _async_stop_travel(self):
         """Stop the cover callack."""
         self._travel_stop()
         await self._becker.stop(self._channel)
 
     @callback
-    async def _async_update_ha_state(self, _):
+    async def _async_update_ha_state(self):
         """Update HA-State while travelling."""
         self._update_scheduled_ha_state_callback(0)
 
@@ -487,7 +843,7 @@ class BeckerEntity(CoverEntity, RestoreEntity):
     async def _async_on_template_update(self, _, updates):
         """Update position on template update"""
         result = updates.pop().result
-        self._attr[CONF_VALUE_TEMPLATE] = result
+        self._template_result = result
         if isinstance(result, TemplateError):
             _LOGGER.error('%s: Update template with error', self._name)
         else:
@@ -513,5 +869,8 @@ class BeckerEntity(CoverEntity, RestoreEntity):
                 pos = self.current_cover_position
             # In TravelCalculator 0 is open, 100 is closed.
             self._tc.set_position(100 - pos)
-            self._attr[CONF_VALUE_TEMPLATE] = result
-            self.async_schedule_update_ha_state()
+            if self._retransmit_state is not None and self._retransmit_state[2] == pos:
+                _LOGGER.debug("%s: Position %s confirmed, stop retransmission", self._name, pos)
+                self._cancel_retransmit()
+            self._template_result = result
+            self.async_write_state_if_changed()
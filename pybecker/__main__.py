@@ -1,8 +1,34 @@
 import argparse
 import asyncio
+import collections
+import itertools
+import json
+import sys
 import time
 
 from pybecker.becker import Becker
+from pybecker.becker_helper import (
+    COMMANDS,
+    DUTY_CYCLE,
+    ETX,
+    MESSAGE,
+    PacketDecoder,
+    checksum,
+    finalize_code,
+    generate_code,
+)
+from pybecker.capture import REPLAY_SCHEME
+from pybecker.gateway import DEFAULT_PORT, BeckerGateway
+from pybecker.provision import PROVISION_GAP
+
+ACTIONS = {
+    'UP': Becker.move_up,
+    'UP2': Becker.move_up_intermediate,
+    'DOWN': Becker.move_down,
+    'DOWN2': Becker.move_down_intermediate,
+    'HALT': Becker.stop,
+    'PAIR': Becker.pair,
+}
 
 
 async def main():
@@ -12,7 +38,7 @@ async def main():
     parser.add_argument(
         '-a',
         '--action',
-        choices=['UP', 'UP2', 'DOWN', 'DOWN2', 'HALT', 'PAIR'],
+        choices=list(ACTIONS),
         help='Command to execute (UP, DOWN, HALT, PAIR)',
     )
     parser.add_argument('-d', '--device', help='Device to use for connectivity')
@@ -23,12 +49,134 @@ async def main():
         type = int,
         help='Logs received commands (only UP, DOWN, HALT) for a certain time (in seconds)'
     )
+    parser.add_argument(
+        '-m',
+        '--metrics',
+        action='store_true',
+        help='Print transport metrics as JSON on exit'
+    )
+    parser.add_argument('--capture', help='Capture raw traffic to a binary file')
+    parser.add_argument('--replay', help='Replay received traffic of a capture file instead of using a device')
+    parser.add_argument(
+        '--speed',
+        type=float,
+        default=1.0,
+        help='Speed factor for --replay (default 1.0, 0 as fast as possible)'
+    )
+
+    # Subcommands, device and file may be given before or after the subcommand
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('-d', '--device', default=argparse.SUPPRESS, help='Device to use for connectivity')
+    common.add_argument('-f', '--file', default=argparse.SUPPRESS, help='Database file')
+    subparsers = parser.add_subparsers(dest='subcommand')
+    serve = subparsers.add_parser(
+        'serve',
+        parents=[common],
+        help='Share the device with several clients over TCP (socket://<host>:<port>)',
+    )
+    serve.add_argument('--host', default='0.0.0.0', help='Address to listen on (default 0.0.0.0)')
+    serve.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default {DEFAULT_PORT})')
+    batch = subparsers.add_parser(
+        'batch',
+        parents=[common],
+        help='Send commands of a script through one connection',
+    )
+    batch.add_argument(
+        'script',
+        nargs='?',
+        default='-',
+        help='File with one "<channel> <action>" or "SLEEP <seconds>" per line (default stdin)',
+    )
+    sniff = subparsers.add_parser(
+        'sniff',
+        parents=[common],
+        help='Print received packets as JSON lines',
+    )
+    sniff.add_argument(
+        '-t',
+        '--time',
+        type=float,
+        help='Stop after a certain time (in seconds), default until interrupted',
+    )
+    bench = subparsers.add_parser(
+        'bench',
+        parents=[common],
+        help='Send a synthetic workload and report throughput and latencies. '
+             'Covers of the given channels will move!',
+    )
+    bench.add_argument(
+        '--channels',
+        default='1:1',
+        help='Comma separated channels of the workload (default 1:1)',
+    )
+    bench.add_argument(
+        '--actions',
+        default='UP,HALT,DOWN,HALT',
+        help='Comma separated actions sent in turn to each channel (default UP,HALT,DOWN,HALT)',
+    )
+    bench.add_argument('--count', type=int, default=20, help='Number of commands (default 20)')
+    bench.add_argument(
+        '--rate',
+        type=float,
+        default=2.0,
+        help='Commands per second of all senders (default 2, 0 as fast as possible)',
+    )
+    bench.add_argument('--senders', type=int, default=1, help='Number of concurrent senders (default 1)')
+    bench.add_argument(
+        '--duty-cycle',
+        type=float,
+        default=DUTY_CYCLE,
+        help=f'Airtime limit in percent (default {DUTY_CYCLE}, 0 disables e.g. for emulators)',
+    )
+    bench.add_argument(
+        '--decoder',
+        action='store_true',
+        help='Benchmark the frame decoder against the single MESSAGE regex instead, without device',
+    )
+    provision = subparsers.add_parser(
+        'provision',
+        parents=[common],
+        help='Pair several channels in a row, an interrupted run resumes with the next channel',
+    )
+    provision.add_argument('channels', nargs='+', help='Channels to pair like 1:2, in pairing order')
+    provision.add_argument(
+        '--gap',
+        type=float,
+        default=PROVISION_GAP,
+        help=f'Seconds to put the next receiver into pairing mode (default {PROVISION_GAP:g})',
+    )
+    provision.add_argument('--progress', help='Progress file (default next to the database file)')
+    provision.add_argument('--restart', action='store_true', help='Forget the results of previous runs')
     args = parser.parse_args()
 
+    if args.subcommand == 'serve':
+        await serve_gateway(args)
+        return
+    if args.subcommand == 'batch':
+        await run_batch(args)
+        return
+    if args.subcommand == 'sniff':
+        await sniff_packets(args)
+        return
+    if args.subcommand == 'provision':
+        await run_provision(args)
+        return
+    if args.subcommand == 'bench' and args.decoder:
+        bench_decoder(args.count)
+        return
+    if args.subcommand == 'bench':
+        if any(action not in ACTIONS for action in args.actions.split(',')):
+            parser.error(f"--actions must be of {', '.join(ACTIONS)}")
+        await run_bench(args)
+        return
+
     if (args.channel is None) != (args.action is None):
         parser.error('both --channel and --action are required')
 
-    if args.log is None:
+    if args.replay is not None:
+        args.device = f"{REPLAY_SCHEME}{args.replay}?speed={args.speed}"
+
+    if args.log is None and args.replay is None:
         callback = None
     else:
         commands = {'1':'HALT', '2':'UP', '4':'DOWN',}
@@ -41,31 +189,248 @@ async def main():
         )
 
     client = Becker(device_name=args.device, db_filename=args.file, callback=callback)
+    if args.capture is not None:
+        client.start_capture(args.capture)
 
-    if args.action == "UP":
-        await client.move_up(args.channel)
-    elif args.action == "UP2":
-        await client.move_up_intermediate(args.channel)
-    elif args.action == "HALT":
-        await client.stop(args.channel)
-    elif args.action == "DOWN":
-        await client.move_down(args.channel)
-    elif args.action == "DOWN2":
-        await client.move_down_intermediate(args.channel)
-    elif args.action == "PAIR":
-        await client.pair(args.channel)
+    if args.action is not None:
+        await ACTIONS[args.action](client, args.channel)
 
     # wait for log
-    timeout = time.time() + (args.log or 0)
-    while timeout > time.time():
-        time.sleep(0.01)
+    if args.log:
+        await asyncio.sleep(args.log)
+
+    # wait for replay
+    if args.replay is not None:
+        while not client.communicator.connection.finished:
+            await asyncio.sleep(0.1)
+        # let communicator parse the last data
+        await asyncio.sleep(0.2)
 
     # graceful shutdown
     client.close()
 
-if __name__ == '__main__':
-    import sys
+    if args.metrics:
+        print(json.dumps(client.metrics.as_dict(), indent=2))
+
+async def serve_gateway(args):
+    """Run network gateway until interrupted."""
+    gateway = BeckerGateway(args.host, args.port)
+    # received frames are forwarded unfiltered, clients filter repeated frames
+    client = Becker(
+        device_name=args.device, db_filename=args.file, callback=gateway.callback, dedup_window=0
+    )
+    try:
+        await gateway.start(client)
+        await gateway.serve_forever()
+    finally:
+        client.close()
+
+async def run_batch(args):
+    """Send all commands of a script through one connection."""
+    script = sys.stdin if args.script == '-' else open(args.script)   # pylint: disable=consider-using-with
+    client = Becker(device_name=args.device, db_filename=args.file)
+    summary = collections.Counter()
+    start = time.monotonic()
+    try:
+        for number, line in enumerate(script, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            try:
+                target, action = line.split()
+                if target.upper() == 'SLEEP':
+                    # earlier commands have to be sent before the pause starts
+                    await wait_for_queue(client)
+                    await asyncio.sleep(float(action))
+                    continue
+                await ACTIONS[action.upper()](client, target)
+            except (KeyError, ValueError):
+                print(f"line {number}: invalid command '{line}'", file=sys.stderr)
+                summary['invalid'] += 1
+            else:
+                summary[action.upper()] += 1
+        await wait_for_queue(client)
+    finally:
+        if script is not sys.stdin:
+            script.close()
+        client.close()
+    print_summary(client, start, commands=dict(summary))
+
 
+async def run_provision(args):
+    """Pair channels in a row and print the result of each channel as JSON line."""
+    client = Becker(device_name=args.device, db_filename=args.file)
+    start = time.monotonic()
+
+    def report(channel, status):
+        print(json.dumps({'channel': channel, 'status': status}), flush=True)
+
+    try:
+        results = await client.provision(args.channels, args.gap, args.progress, args.restart, report)
+    finally:
+        client.close()
+    statuses = collections.Counter(results[channel]['status'] for channel in args.channels)
+    print_summary(client, start, channels=dict(statuses))
+
+
+async def sniff_packets(args):
+    """Print received packets as JSON lines until interrupted."""
+    loop = asyncio.get_running_loop()
+    packets = asyncio.Queue()
+    summary = collections.Counter()
+    start = time.monotonic()
+
+    def callback(packet):
+        """Runs in the communicator thread, hand packet over to the event loop."""
+        loop.call_soon_threadsafe(packets.put_nowait, (time.time(), packet))
+
+    client = Becker(device_name=args.device, db_filename=args.file, callback=callback)
+    try:
+        async with asyncio.timeout(args.time):
+            while True:
+                timestamp, packet = await packets.get()
+                command = packet.group('command')
+                command = COMMANDS.get(command) or command.decode()
+                summary[command] += 1
+                print(json.dumps({
+                    'timestamp': timestamp,
+                    'unit_id': packet.group('unit_id').decode(),
+                    'channel': packet.group('channel').decode(),
+                    'command': command,
+                    'argument': packet.group('argument').decode(),
+                    'increment': int(packet.group('increment'), 16),
+                }), flush=True)
+    except (TimeoutError, asyncio.CancelledError):
+        pass
+    finally:
+        client.close()
+        print_summary(client, start, commands=dict(summary))
+
+
+async def run_bench(args):
+    """Send a synthetic workload and print a report as JSON."""
+    client = Becker(
+        device_name=args.device, db_filename=args.file, init_dummy=True, duty_cycle=args.duty_cycle
+    )
+    metrics = client.metrics
+    workload = itertools.islice(
+        itertools.cycle(itertools.product(args.actions.split(','), args.channels.split(','))),
+        args.count,
+    )
+    interval = args.senders / args.rate if args.rate > 0 else 0
+    max_queue_depth = 0
+    start = time.monotonic()
+
+    async def sender(offset):
+        """Send commands of the shared workload at the rate of one sender."""
+        nonlocal max_queue_depth
+        due = start + offset
+        for action, channel in workload:
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            due += interval
+            await ACTIONS[action](client, channel)
+            max_queue_depth = max(max_queue_depth, client.queue_size)
+
+    try:
+        await asyncio.gather(
+            *(sender(i * interval / args.senders) for i in range(args.senders))
+        )
+        submitted = time.monotonic() - start
+        await wait_for_queue(client)
+        # the last packet is written after the queue is empty
+        await asyncio.sleep(0.2)
+    finally:
+        client.close()
+    duration = time.monotonic() - start
+    queue_wait = metrics.queue_wait.as_dict()
+    latency = metrics.enqueue_to_wire.as_dict()
+    db_write = metrics.db_write.as_dict()
+    print(json.dumps({
+        'commands': db_write['count'],
+        'frames_sent': metrics.frames_sent,
+        'duration': round(duration, 3),
+        'submit_duration': round(submitted, 3),
+        'frames_per_second': round(metrics.frames_sent / duration, 3),
+        'max_queue_depth': max_queue_depth,
+        'queue_wait': {key: queue_wait[key] for key in ('avg', 'p50', 'p95', 'p99', 'max')},
+        'airtime_wait': round(metrics.airtime_wait, 3),
+        'enqueue_to_wire': {key: latency[key] for key in ('avg', 'p50', 'p95', 'p99', 'max')},
+        'db_write': {key: db_write[key] for key in ('avg', 'p50', 'p95', 'p99', 'max')},
+    }, indent=2))
+
+
+def bench_decoder(count):
+    """Compare decoding by PacketDecoder with scanning by the single MESSAGE regex."""
+    frames = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            # remote
+            frames.append(finalize_code(generate_code(i % 7 + 1, ['12345', i], 0x20)))
+        elif kind == 1:
+            # wall mounted sender
+            frames.append(finalize_code(generate_code(0, ['23456', i], 0x40)))
+        elif kind == 2:
+            # unknown frame type
+            frames.append(finalize_code(checksum('0000000003020B' + '%026X' % i)))
+        else:
+            # malformed frame
+            frames.append(finalize_code(generate_code(1, ['34567', i], 0x10))[:30] + ETX)
+    buffer = b''.join(frames)
+
+    def regex_scan():
+        packets = 0
+        failures = 0
+        end = 0
+        for data in MESSAGE.finditer(buffer):
+            failures += buffer.count(ETX, end, data.start())
+            end = data.end()
+            packets += 1
+        return packets, failures + buffer.count(ETX, end)
+
+    def decoder_scan():
+        packets, _, malformed, unknown, _ = PacketDecoder().decode(buffer)
+        return len(packets), malformed + unknown
+
+    report = {'frames': count}
+    for name, scan in (('regex', regex_scan), ('decoder', decoder_scan)):
+        repeat = 0
+        start = time.perf_counter()
+        while repeat < 3 or time.perf_counter() - start < 1:
+            result = scan()
+            repeat += 1
+        duration = (time.perf_counter() - start) / repeat
+        report[name] = {
+            'decoded': result[0],
+            'skipped': result[1],
+            'frames_per_second': round(count / duration),
+        }
+    print(json.dumps(report, indent=2))
+
+
+async def wait_for_queue(client):
+    """Wait until all queued packets are sent."""
+    while client.queue_size:
+        await asyncio.sleep(0.1)
+
+
+def print_summary(client, start, **extra):
+    """Print summary statistics as JSON to stderr."""
+    metrics = client.metrics
+    print(json.dumps({
+        'duration': round(time.monotonic() - start, 3),
+        'frames_sent': metrics.frames_sent,
+        'frames_received': metrics.frames_received,
+        'suppressed_frames': metrics.suppressed_frames,
+        'dropped_frames': metrics.dropped_frames,
+        'parse_failures': metrics.parse_failures,
+        **extra,
+    }), file=sys.stderr)
+
+
+if __name__ == '__main__':
     # to avoid crashing on exit when running on windows
     if sys.version_info[0] == 3 and sys.version_info[1] >= 8 and sys.platform.startswith('win'):
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
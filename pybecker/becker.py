@@ -1,14 +1,20 @@
 # pylint: disable=missing-function-docstring
 # pylint: disable=missing-class-docstring
 import logging
-import re
 import asyncio
+import time
+from collections import namedtuple
 from random import randrange
 
 from .becker_helper import finalize_code
 from .becker_helper import generate_code
 from .becker_helper import BeckerCommunicator
+from .becker_helper import DEDUP_WINDOW, DUTY_CYCLE
+from .becker_helper import COMMUNICATION_TIMEOUT
+from .becker_helper import DuplicateFilter
 from .database import Database
+from .provision import PROVISION_GAP, STATUS_INVALID, STATUS_SENT
+from .provision import ProvisionProgress, progress_filename
 
 COMMAND_RELEASE = 0x00  # button release
 COMMAND_UP = 0x20
@@ -34,6 +40,77 @@ COMMAND_CLEARPOS4 = 0x93
 
 # DEFAULT_DEVICE_NAME moved to becker_helper
 
+# Frames sent without delay in between: ((command, increment offset), ...) and delay after them
+Batch = namedtuple('Batch', ['frames', 'delay'])
+# Compiled command sequence, length is the number of increments used
+Sequence = namedtuple('Sequence', ['batches', 'length', 'configures'])
+
+# Commands of a sequence are sent with consecutive increments. A (command, delay)
+# step waits delay seconds after the frame.
+SEQUENCE_TABLE = {
+    'UP': (COMMAND_UP,),
+    'UP2': (COMMAND_UP5,),
+    'HALT': (COMMAND_HALT,),
+    'RELEASE': (COMMAND_RELEASE,),
+    'DOWN': (COMMAND_DOWN,),
+    'DOWN2': (COMMAND_DOWN5,),
+    'CLEARPOS': (COMMAND_PAIR, COMMAND_CLEARPOS, COMMAND_CLEARPOS2, COMMAND_CLEARPOS3, COMMAND_CLEARPOS4),
+    'REMOVE': (COMMAND_PAIR2, COMMAND_RELEASE, COMMAND_PAIR2, COMMAND_PAIR3, COMMAND_PAIR4),
+}
+# Sequences pairing the USB stick, they are allowed for unconfigured units and configure the unit
+PAIRING_TABLE = {
+    'TRAIN': (COMMAND_PAIR2, COMMAND_RELEASE, COMMAND_PAIR2),
+    'TRAINMASTER': (COMMAND_PAIR, COMMAND_PAIR2, COMMAND_PAIR3, COMMAND_PAIR4),
+}
+# Timed moves like "UP:10" move for the given seconds and halt
+TIMED_MOVES = {'UP': COMMAND_UP, 'DOWN': COMMAND_DOWN}
+
+
+def compile_sequence(steps, configures=False):
+    """
+        Compile steps of a command sequence.
+
+        :param steps: commands or (command, delay in seconds) tuples
+        :param configures: the sequence pairs and configures the unit
+        :return: Sequence
+    """
+    batches = []
+    frames = []
+    for offset, step in enumerate(steps):
+        command, delay = step if isinstance(step, tuple) else (step, 0)
+        frames.append((command, offset))
+        if delay > 0:
+            batches.append(Batch(tuple(frames), delay))
+            frames = []
+    if frames:
+        batches.append(Batch(tuple(frames), 0))
+    return Sequence(tuple(batches), len(steps), configures)
+
+
+SEQUENCES = {name: compile_sequence(steps) for name, steps in SEQUENCE_TABLE.items()}
+SEQUENCES.update(
+    (name, compile_sequence(steps, configures=True)) for name, steps in PAIRING_TABLE.items()
+)
+
+
+def register_sequence(name, steps, configures=False):
+    """
+        Register a custom command sequence, which can be sent like any other command.
+
+        :param name: name of the command, e.g. "UPHALT"
+        :param steps: commands or (command, delay in seconds) tuples, e.g. [(0x20, 2.5), 0x10]
+        :param configures: the sequence pairs and configures the unit
+    """
+    SEQUENCES[name] = compile_sequence(steps, configures)
+
+
+def timed_sequence(cmd):
+    """Return sequence of a timed move like "UP:10", None if cmd is no timed move."""
+    direction, _, seconds = cmd.partition(':')
+    if direction not in TIMED_MOVES or not seconds.isdigit():
+        return None
+    return compile_sequence(((TIMED_MOVES[direction], int(seconds)), COMMAND_HALT))
+
 logging.basicConfig()
 _LOGGER = logging.getLogger(__name__)
 
@@ -46,16 +123,41 @@ class Becker:
         Use this class to perform operations on your Becker Shutter using a centronic USB Stick
         This class will as well maintain a call increment in an internal database
     """
-    def __init__(self, device_name=None, init_dummy=False, db_filename=None, callback=None):
+    def __init__(
+        self, device_name=None, init_dummy=False, db_filename=None, callback=None,
+        dedup_window=DEDUP_WINDOW, shards=None, duty_cycle=DUTY_CYCLE,
+    ):
         """
             Create a new instance of the Becker controller
 
             :param  device_name: The path for the centronic stick (default /dev/serial/by-id/usb-BECKER-ANTRIEBE_GmbH_CDC_RS232_v125_Centronic-if00).
             :param  init_dummy: Boolean that indicate if the database should be initialized with a dummy unit (default False).
+            :param  dedup_window: Seconds to suppress repeated frames of one button press, 0 disables (default 1.0).
+            :param  shards: Additional sticks or gateways, mapping each device to the channels it transmits,
+                            e.g. {"socket://gateway:5000": ["2:*", "1:3"]}. "2:*" are all channels of unit 2.
+                            All other channels are transmitted by device_name.
+            :param  duty_cycle: Percent of airtime per rolling hour each device may transmit, 0 disables (default 1.0).
             :type device_name: str
             :type init_dummy: bool
+            :type dedup_window: float
+            :type shards: dict
+            :type duty_cycle: float
         """
-        self.communicator = BeckerCommunicator(device_name, callback)
+        # Received packets of all sticks are merged into one deduplicated feed
+        duplicate_filter = DuplicateFilter(dedup_window)
+        self.communicator = BeckerCommunicator(
+            device_name, callback, duplicate_filter=duplicate_filter, duty_cycle=duty_cycle
+        )
+        self.communicators = {device_name: self.communicator}
+        self._routes = {}
+        for device, channels in (shards or {}).items():
+            communicator = BeckerCommunicator(
+                device, callback, duplicate_filter=duplicate_filter, duty_cycle=duty_cycle
+            )
+            self.communicators[device] = communicator
+            for channel in channels:
+                self._routes[self._split_route(channel)] = communicator
+        self.metrics = self.communicator.metrics
         self.db = Database(db_filename)
 
         # If no unit is defined create a dummy one
@@ -63,107 +165,113 @@ class Becker:
         if not units and init_dummy:
             self.db.init_dummy()
 
-        # Start communicator thread
-        self.communicator.start()
+        # Start communicator threads
+        for communicator in self.communicators.values():
+            communicator.start()
+
+    @property
+    def connection_state(self):
+        """Return state of the connection to the device (connected, reconnecting, closed)."""
+        return self.communicator.connection_state
+
+    @property
+    def queue_size(self):
+        """Return number of packets waiting for transmission on all devices."""
+        return sum(communicator.queue_size for communicator in self.communicators.values())
+
+    def set_senders(self, unit_ids):
+        """
+            Accept received remote command frames of the given senders only, others are dropped.
+
+            :param unit_ids: unit ids of the senders, None or no unit ids accept all senders
+            :type unit_ids: iterable of str or bytes
+        """
+        senders = None
+        if unit_ids is not None:
+            senders = frozenset(
+                (unit_id.encode() if isinstance(unit_id, str) else unit_id).upper()
+                for unit_id in unit_ids
+            ) or None
+        for communicator in self.communicators.values():
+            communicator.decoder.senders = senders
+
+    def start_capture(self, filename):
+        """
+            Start capture of raw traffic of the (primary) device.
+
+            :param filename: the binary capture file, see pybecker.capture
+            :type filename: str
+        """
+        self.communicator.start_capture(filename)
+
+    def stop_capture(self):
+        """Stop capture of raw traffic."""
+        self.communicator.stop_capture()
 
     def close(self):
-        """Stop communicator thread, close device and database"""
-        self.communicator.close()
+        """Stop communicator threads, close devices and database"""
+        for communicator in self.communicators.values():
+            communicator.close()
         self.db.conn.close()
 
-    async def write(self, codes):
+    async def write(self, codes, communicator=None, priority=None):
+        communicator = communicator or self.communicator
         for code in codes:
-            self.communicator.send(finalize_code(code))
+            communicator.send(finalize_code(code), priority)
             # Sleep implemented in BeckerCommunicator
 
-    async def run_codes(self, channel, unit, cmd, test):
-        if unit[2] == 0 and cmd != "TRAIN":
+    def _route(self, un, ch):
+        """Return communicator transmitting channel ch of unit un."""
+        return (
+            self._routes.get((un, ch))
+            or self._routes.get((un, None))
+            or self.communicator
+        )
+
+    async def run_codes(self, channel, unit, cmd, test, communicator=None, priority=None):
+        sequence = SEQUENCES.get(cmd) or timed_sequence(cmd)
+        if sequence is None:
+            _LOGGER.error("Unknown command %s", cmd)
+            return
+        if unit[2] == 0 and not sequence.configures:
             _LOGGER.error("The unit %s is not configured", (unit[0]))
             return
 
-        # move up/down dependent on given time
-        mt = re.match(r"(DOWN|UP):(\d+)", cmd)
-
-        codes = []
-        if cmd == "UP":
-            codes.append(generate_code(channel, unit, COMMAND_UP))
-        elif cmd == "UP2":
-            codes.append(generate_code(channel, unit, COMMAND_UP5))
-        elif cmd == "HALT":
-            codes.append(generate_code(channel, unit, COMMAND_HALT))
-        elif cmd == "RELEASE":
-            codes.append(generate_code(channel, unit, COMMAND_RELEASE))
-        elif cmd == "DOWN":
-            codes.append(generate_code(channel, unit, COMMAND_DOWN))
-        elif cmd == "DOWN2":
-            codes.append(generate_code(channel, unit, COMMAND_DOWN5))
-        elif cmd == "TRAIN":
-            codes.append(generate_code(channel, unit, COMMAND_PAIR2))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, 0x00))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, COMMAND_PAIR2))
-            # set unit as configured
-            unit[2] = 1
-        elif cmd == "CLEARPOS":
-            codes.append(generate_code(channel, unit, COMMAND_PAIR))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, COMMAND_CLEARPOS))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, COMMAND_CLEARPOS2))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, COMMAND_CLEARPOS3))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, COMMAND_CLEARPOS4))
-        elif cmd == "REMOVE":
-            codes.append(generate_code(channel, unit, COMMAND_PAIR2))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, 0x00))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, COMMAND_PAIR2))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, COMMAND_PAIR3))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, COMMAND_PAIR4))
-        elif cmd == "TRAINMASTER":
-            codes.append(generate_code(channel, unit, COMMAND_PAIR))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, COMMAND_PAIR2))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, COMMAND_PAIR3))
-            unit[1] += 1
-            codes.append(generate_code(channel, unit, COMMAND_PAIR4))
-            # set unit as configured
+        # encode all frames of a batch before they are queued together
+        increment = unit[1]
+        for batch in sequence.batches:
+            await self.write(
+                [
+                    generate_code(channel, (unit[0], increment + offset), command)
+                    for command, offset in batch.frames
+                ],
+                communicator,
+                priority,
+            )
+            if batch.delay:
+                _LOGGER.info("Wait %s seconds...", batch.delay)
+                await asyncio.sleep(batch.delay)
+        unit[1] = increment + sequence.length
+        if sequence.configures:
             unit[2] = 1
 
-        if mt:
-            _LOGGER.INFO("Moving %s for %s seconds..." % (mt.group(1), mt.group(2)))
-            # move down/up for a specific time
-            if mt.group(1) == "UP":
-                code = generate_code(channel, unit, COMMAND_UP)
-            elif mt.group(1) == "DOWN":
-                code = generate_code(channel, unit, COMMAND_DOWN)
-
-            unit[1] += 1
-            await self.write([code])
-
-            await asyncio.sleep(int(mt.group(2)))
-
-            # stop moving
-            code = generate_code(channel, unit, COMMAND_HALT)
-            unit[1] += 1
-            await self.write([code])
-        else:
-            unit[1] += 1
-
-        # append the release button code
-        #codes.append(generate_code(channel, unit, 0))
-        #unit[1] += 1
-
-        await self.write(codes)
+        start = time.monotonic()
         self.db.set_unit(unit, test)
+        self.metrics.db_write.observe(time.monotonic() - start)
 
-    async def send(self, channel, cmd, test=False):
+    async def send(self, channel, cmd, test=False, priority=None):
+        """
+            Send the command to a given channel, each time with a new increment.
+
+            :param channel: the channel on which the shutter is listening
+            :param cmd: the command, see SEQUENCES
+            :param test: do not store the increment in the database
+            :param priority: the queue priority, e.g. PRIORITY_RETRANSMIT for repeated commands
+            :type channel: str
+            :type cmd: str
+            :type test: bool
+            :type priority: int
+        """
 
         un, ch = self._split_channel(channel)
 
@@ -175,11 +283,12 @@ class Becker:
 
         if un > 0:
             unit = self.db.get_unit(un)
-            await self.run_codes(ch, unit, cmd, test)
+            await self.run_codes(ch, unit, cmd, test, self._route(un, ch), priority)
         else:
             units = self.db.get_all_units()
             for unit in units:
-                await self.run_codes(ch, unit, cmd, test)
+                communicator = self._route(self.db.get_rowid_from_unit(unit[0]), ch)
+                await self.run_codes(ch, unit, cmd, test, communicator, priority)
 
     async def move_up(self, channel):
         """
@@ -235,6 +344,86 @@ class Becker:
         """
         await self.send(channel, "TRAIN")
 
+    async def provision(self, channels, gap=PROVISION_GAP, progress_file=None, restart=False, report=None):
+        """
+            Pair several channels in a row, e.g. all covers of an installation.
+
+            The pairing frames of all channels are generated up front and the increments of
+            each unit are allocated with a single database write. The channels are paired
+            one after the other and gap seconds before each channel allow the operator to
+            put its receiver into pairing mode. The result of each channel is stored in
+            progress_file and a later call with the same channels resumes where an
+            interrupted run stopped.
+
+            :param channels: the channels to pair like "1:2", in pairing order
+            :param gap: seconds to wait before the pairing of each channel
+            :param progress_file: JSON file of the results (default next to the database file)
+            :param restart: forget the results of previous runs
+            :param report: called with channel and status after each channel
+            :type channels: list of str
+            :type gap: float
+            :type progress_file: str
+            :type restart: bool
+            :type report: callable
+            :return: results of all channels of the progress file
+        """
+        progress = ProvisionProgress(progress_file or progress_filename(self.db.filename))
+        if restart:
+            progress.reset()
+
+        targets = []
+        for channel in progress.pending(channels):
+            try:
+                un, ch = self._split_channel(channel)
+            except ValueError:
+                un = ch = 0
+            if not 1 <= ch <= 7 or self.db.get_unit(un) is None:
+                _LOGGER.error("Invalid channel %s to provision", channel)
+                progress.record(channel, STATUS_INVALID)
+                if report is not None:
+                    report(channel, STATUS_INVALID)
+                continue
+            targets.append((channel, un, ch))
+
+        # allocate the increments of all targets of a unit at once
+        sequence = SEQUENCES['TRAIN']
+        units = {}
+        codes = []
+        for channel, un, ch in targets:
+            if un not in units:
+                units[un] = self.db.get_unit(un)
+            unit = units[un]
+            codes.append([
+                [
+                    generate_code(ch, (unit[0], unit[1] + offset), command)
+                    for command, offset in batch.frames
+                ]
+                for batch in sequence.batches
+            ])
+            unit[1] += sequence.length
+            unit[2] = 1
+        start = time.monotonic()
+        for unit in units.values():
+            self.db.set_unit(unit)
+        self.metrics.db_write.observe(time.monotonic() - start)
+
+        for index, ((channel, un, ch), batches) in enumerate(zip(targets, codes)):
+            _LOGGER.info("Wait %s seconds before pairing %s...", gap, channel)
+            await asyncio.sleep(gap)
+            communicator = self._route(un, ch)
+            for batch, batch_codes in zip(sequence.batches, batches):
+                await self.write(batch_codes, communicator)
+                if batch.delay:
+                    await asyncio.sleep(batch.delay)
+            # the channel is done once its frames left the transmit queue
+            while communicator.queue_size:
+                await asyncio.sleep(COMMUNICATION_TIMEOUT / 3)
+            progress.record(channel, STATUS_SENT)
+            _LOGGER.info("Pairing of %s sent (%d/%d)", channel, index + 1, len(targets))
+            if report is not None:
+                report(channel, STATUS_SENT)
+        return progress.as_dict()
+
     async def list_units(self):
         """
         Return all configured units as a list.
@@ -242,6 +431,25 @@ class Becker:
 
         return self.db.get_all_units()
 
+    def recent_packets(self):
+        """
+        Return the last sent and received packets as a list of dicts, oldest first.
+        """
+
+        packets = []
+        for communicator in self.communicators.values():
+            packets.extend(communicator.history.packets())
+        if len(self.communicators) > 1:
+            packets.sort(key=lambda packet: packet['timestamp'])
+        return packets
+
+    @classmethod
+    def _split_route(cls, channel):
+        """Split channel of shard configuration, channel None are all channels of the unit."""
+        if channel.endswith(':*'):
+            return int(channel[:-2]), None
+        return cls._split_channel(channel)
+
     @staticmethod
     def _split_channel(channel):
         b = channel.split(':')
@@ -1,15 +1,27 @@
 """Helper for Becker centronic USB Stick."""
+import collections
+import heapq
+import itertools
 import logging
 import re
 import time
 import threading
 import queue
-from typing import Any, Callable, Tuple
+from typing import Any, Callable, Optional, Tuple
 import os
 import sys
 import serial
 import serial.tools.list_ports
 
+from .capture import (
+    DIRECTION_RX,
+    DIRECTION_TX,
+    REPLAY_SCHEME,
+    PacketCapture,
+    ReplayConnection,
+)
+from .metrics import BeckerMetrics
+
 STX = b'\x02'
 ETX = b'\x03'
 
@@ -23,7 +35,7 @@ DEFAULT_DEVICE_NAME = '/dev/serial/by-id/usb-BECKER-ANTRIEBE_GmbH_CDC_RS232_v125
 MESSAGE = re.compile(
       STX
     + CODE_PREFIX.encode()
-    + rb'[0-9A-F]{4,4}'
+    + rb'(?P<increment>[0-9A-F]{4,4})'
     + CODE_SUFFIX.encode()
     + rb'(?P<unit_id>[0-9A-F]{5,5})'
     + rb'[0-9A-F]{6,6}'
@@ -35,8 +47,44 @@ MESSAGE = re.compile(
     + ETX, re.I
 )
 
+# Frame types by header (the first characters of the code) and their parsers.
+# The parsers match the complete frame including STX and ETX.
+HEADER_LENGTH = len(CODE_PREFIX)
+# Position of the unit id of the sender within a frame (after STX)
+UNIT_ID_SLICE = slice(25, 30)
+FRAME_TYPES = {
+    CODE_PREFIX.encode(): MESSAGE,
+}
+# Any complete frame
+FRAME = re.compile(STX + rb'[^\x02\x03]*' + ETX)
+# Frames of other types than remote commands, the group is the header
+OTHER_FRAME = re.compile(
+    STX + b'(?!' + CODE_PREFIX.encode() + rb')([^\x02\x03]{0,%d})[^\x02\x03]*' % HEADER_LENGTH + ETX,
+    re.I,
+)
+
+CONNECTION_CONNECTED = 'connected'
+CONNECTION_RECONNECTING = 'reconnecting'
+CONNECTION_CLOSED = 'closed'
+
 COMMANDS = {b'0': 'RELEASE', b'1': 'HALT', b'2': 'UP', b'4': 'DOWN', b'8': 'TRAIN'}
 COMMUNICATION_TIMEOUT = 0.3
+RECONNECT_DELAY_MIN = 0.5
+RECONNECT_DELAY_MAX = 30.0
+DEDUP_WINDOW = 1.0  # seconds to suppress repeated frames of one button press
+PACKET_HISTORY_SIZE = 100
+DUTY_CYCLE = 1.0  # percent of airtime per rolling hour allowed in the 868 MHz band
+AIRTIME_PERIOD = 3600.0
+FRAME_AIRTIME = 0.05  # estimated seconds on air of one frame including its repetitions
+# Position of the channel and the command within a framed packet
+CHANNEL_SLICE = slice(35, 37)
+COMMAND_SLICE = slice(39, 41)
+# Commands sent before the queued packets of other channels
+URGENT_COMMANDS = (b'10',)  # HALT
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 1
+PRIORITY_RETRANSMIT = 2  # repeated commands must not delay fresh commands
+TRANSMIT_QUEUE_SIZE = 100
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -108,7 +156,13 @@ class BeckerConnection():
             raise BeckerConnectionError(
                 "Error when trying to establish connection using {}.".format(self.device)
             ) from err
-        self._open()
+        try:
+            self.open()
+        except BeckerConnectionError:
+            if self.is_serial:
+                raise
+            # BeckerCommunicator will re-connect
+            _LOGGER.error("Establish connection to %s failed!", self.device)
 
     @property
     def is_serial(self) -> bool:
@@ -120,52 +174,53 @@ class BeckerConnection():
         """Return device name."""
         return self._device
 
+    @property
+    def is_open(self) -> bool:
+        """Return if connection is open."""
+        return self._connection.is_open
+
     def write(self, packet: bytes) -> None:
-        """Write data."""
-        self._open()
+        """Write data. Close connection and raise BeckerConnectionError on error."""
+        self.open()
         try:
             self._connection.write(packet)
-        except serial.SerialException:
-            if self._is_serial:
-                raise
-            # Re-connect on error
-            _LOGGER.debug("Write failed. Try to close and re-open connection to %s", self.device)
-            self._connection.close()
-            self._open()
-            self._connection.write(packet)
+        except (serial.SerialException, OSError) as err:
+            self.close()
+            raise BeckerConnectionError(
+                "Write to {} failed.".format(self.device)
+            ) from err
 
     def read(self) -> bytes:
-        """Read data."""
-        packet = bytes()
-        self._open()
+        """Read data. Close connection and raise BeckerConnectionError on error."""
+        self.open()
         try:
-            packet = self._connection.read(1024)
-        except serial.SerialException:
-            if self._is_serial:
-                raise
-            # Re-connect on error
-            _LOGGER.debug("Read failed. Try to close and re-open connection to %s", self.device)
-            self._connection.close()
-        return packet
+            return self._connection.read(1024)
+        except (serial.SerialException, OSError) as err:
+            self.close()
+            raise BeckerConnectionError(
+                "Read from {} failed.".format(self.device)
+            ) from err
 
-    def _open(self) -> None:
+    def open(self) -> None:
+        """Open connection if closed. Raise BeckerConnectionError on error."""
         if not self._connection.is_open:
             _LOGGER.debug("Try to open connection.")
+            if self.is_serial and "/dev/" in self.device and not os.path.exists(self.device):
+                raise BeckerConnectionError("{} is not existing".format(self.device))
             try:
                 self._connection.open()
-            except serial.SerialException as err:
-                if self.is_serial:
-                    raise BeckerConnectionError(
-                        "Error when trying to establish connection using {}.".format(self.device)
-                    ) from err
-                _LOGGER.error("Establish connection to %s failed!", self.device)
-            except:     # pylint: disable=bare-except
-                _LOGGER.error("Establish connection to %s failed!", self.device)
+            except Exception as err:     # pylint: disable=broad-except
+                raise BeckerConnectionError(
+                    "Error when trying to establish connection using {}.".format(self.device)
+                ) from err
 
     def close(self) -> None:
         """Close connection"""
         if self._connection.is_open:
-            self._connection.close()
+            try:
+                self._connection.close()
+            except (serial.SerialException, OSError):
+                pass
 
     @staticmethod
     def _validate_device(device: str) -> Tuple[str, bool]:
@@ -196,6 +251,326 @@ class BeckerConnection():
         return device, is_serial
 
 
+class DuplicateFilter:
+    """
+    Filter for repeated frames of the same button press.
+
+    Remotes repeat each frame several times with the same rolling increment
+    and keep sending while a button is held. A frame is a duplicate if its
+    sender and channel sent the same increment and command within window
+    seconds. The filter is thread safe, so that the receive streams of
+    several sticks can share it.
+    """
+
+    def __init__(self, window: float = DEDUP_WINDOW) -> None:
+        """Initialize filter, window 0 disables the filter."""
+        self.window = window
+        self._last_frames = {}
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, data: re.Match) -> bool:
+        """Return if packet repeats a frame of the same button press."""
+        if self.window <= 0:
+            return False
+        now = time.monotonic()
+        key = data.group('unit_id', 'channel')
+        frame = data.group('increment', 'command', 'argument')
+        with self._lock:
+            last = self._last_frames.get(key)
+            self._last_frames[key] = (frame, now)
+        return last is not None and last[0] == frame and now - last[1] < self.window
+
+
+class PacketDecoder:
+    """
+    Decoder of received frames, dispatching on the frame header.
+
+    Without further registered frame types and sender filter, remote command
+    frames are matched by the single MESSAGE regex and the skipped frames are
+    counted in bulk. Only if frames were skipped, the buffer is scanned a
+    second time for the headers of the frames of unknown type. This keeps the
+    common case of remote frames at the speed of the single regex, a per frame
+    loop in Python would be about three times slower.
+
+    With further registered frame types or a sender filter, the buffer is
+    split into frames once and each frame is dispatched on its header to the
+    registered parser. Frames with an unknown header are counted by header
+    and skipped without further scanning. If senders is set, remote command
+    frames of other senders are dropped by the bytes of their unit id before
+    any parser runs on them.
+    """
+
+    def __init__(self) -> None:
+        """Initialize decoder with the known frame types."""
+        self._parsers = dict(FRAME_TYPES)
+        # handlers of the decoded frames of registered types by parser
+        self._handlers = {}
+        self.unknown_headers = collections.Counter()
+        # unit ids of accepted remotes (upper case bytes), None accepts all
+        self.senders = None
+
+    def register(
+        self, header: bytes, parser: re.Pattern, handler: Callable[[re.Match], Any] = None
+    ) -> None:
+        """
+        Register parser for frames with header, the parser has to match the complete frame.
+
+        The decoded frames are passed to handler instead of the callback of
+        remote commands. Remote command frames are always decoded by MESSAGE.
+        """
+        self._parsers[header.upper()] = parser
+        if handler is not None:
+            self._handlers[parser] = handler
+
+    def handler(self, packet: re.Match) -> Optional[Callable[[re.Match], Any]]:
+        """Return handler of a decoded frame of a registered type, None if there is none."""
+        return self._handlers.get(packet.re)
+
+    def decode(self, buffer: bytes) -> Tuple[list, int, int, int, int]:
+        """
+        Decode all complete frames of buffer.
+
+        Return the decoded packets, the number of consumed bytes, the number
+        of malformed frames, of frames of unknown type and of frames dropped
+        by the sender filter.
+        """
+        # complete frames end with the last ETX, keep a partial frame after it
+        consumed = buffer.find(STX, buffer.rfind(ETX) + 1)
+        if consumed < 0:
+            consumed = len(buffer)
+        senders = self.senders
+        if senders or len(self._parsers) > 1:
+            return self._dispatch(buffer, consumed, senders)
+        packets = list(MESSAGE.finditer(buffer, 0, consumed))
+        frames = buffer.count(ETX, 0, consumed)
+        # frames truncated by a new STX
+        truncated = max(0, buffer.count(STX, 0, consumed) - frames)
+        skipped = frames - len(packets)
+        unknown = 0
+        if skipped:
+            headers = OTHER_FRAME.findall(buffer, 0, consumed)
+            unknown = len(headers)
+            self.unknown_headers.update(headers)
+        malformed = skipped - unknown + truncated
+        return packets, consumed, malformed, unknown, 0
+
+    def _dispatch(
+        self, buffer: bytes, consumed: int, senders: Optional[frozenset]
+    ) -> Tuple[list, int, int, int, int]:
+        """
+        Split buffer into frames and decode them by the parser of their header.
+
+        Remote command frames of other senders are dropped before decoding.
+        """
+        parsers = self._parsers
+        remote = CODE_PREFIX.encode()
+        packets = []
+        malformed = 0
+        unknown = 0
+        filtered = 0
+        end = 0
+        for frame in FRAME.finditer(buffer, 0, consumed):
+            start, stop = frame.span()
+            if start > end:
+                # frames truncated by a new STX
+                malformed += buffer.count(STX, end, start)
+            end = stop
+            header = buffer[start + 1:start + 1 + HEADER_LENGTH].upper()
+            if senders and header == remote and buffer[
+                start + UNIT_ID_SLICE.start:start + UNIT_ID_SLICE.stop
+            ].upper() not in senders:
+                filtered += 1
+                continue
+            parser = parsers.get(header)
+            if parser is None:
+                unknown += 1
+                self.unknown_headers[header] += 1
+                continue
+            packet = parser.match(buffer, start, stop)
+            if packet is None:
+                malformed += 1
+            else:
+                packets.append(packet)
+        malformed += buffer.count(STX, end, consumed)
+        return packets, consumed, malformed, unknown, filtered
+
+
+class PacketHistory:
+    """
+    Fixed size ring of the last packets.
+
+    The ring is preallocated and adding a packet only stores a tuple of the
+    already matched groups, or of the raw frame for sent packets. Decoding
+    into readable values is done on request.
+    """
+
+    __slots__ = ("size", "_ring", "_index")
+
+    def __init__(self, size: int = PACKET_HISTORY_SIZE) -> None:
+        """Initialize ring."""
+        self.size = size
+        self._ring = [None] * size
+        self._index = 0
+
+    def add(self, direction: int, match: re.Match) -> None:
+        """Add decoded packet."""
+        self._ring[self._index % self.size] = (
+            time.time(),
+            direction,
+            match.group('unit_id', 'channel', 'command', 'argument', 'increment'),
+        )
+        self._index += 1
+
+    def add_frame(self, direction: int, packet: bytes) -> None:
+        """Add packet which is not decoded yet."""
+        self._ring[self._index % self.size] = (time.time(), direction, packet)
+        self._index += 1
+
+    def packets(self) -> list:
+        """Return packets from oldest to newest as list of dicts."""
+        index = self._index
+        start = max(0, index - self.size)
+        result = []
+        for i in range(start, index):
+            entry = self._ring[i % self.size]
+            if entry is None:
+                continue
+            timestamp, direction, groups = entry
+            if isinstance(groups, bytes):
+                match = MESSAGE.match(groups)
+                if match is None:
+                    continue
+                groups = match.group('unit_id', 'channel', 'command', 'argument', 'increment')
+            unit_id, channel, command, argument, increment = groups
+            result.append({
+                'timestamp': timestamp,
+                'direction': 'tx' if direction == DIRECTION_TX else 'rx',
+                'unit_id': unit_id.decode(),
+                'channel': channel.decode(),
+                'command': COMMANDS.get(command) or command.decode(),
+                'argument': argument.decode(),
+                'increment': int(increment, 16),
+            })
+        return result
+
+
+class TransmitQueue:
+    """
+    Bounded transmit queue, ordered by priority across channels.
+
+    Packets are keyed by unit id and channel. A packet never overtakes an
+    earlier packet of its own channel, so the rolling increments of a channel
+    leave in order. An urgent packet overtakes the packets of other channels
+    and takes the earlier packets of its channel along. A fresh packet
+    supersedes the queued retransmits of its channel. The queue is thread
+    safe and never blocks.
+    """
+
+    def __init__(self, maxsize: int = TRANSMIT_QUEUE_SIZE) -> None:
+        """Initialize empty queue."""
+        self.maxsize = maxsize
+        # entries [priority, sequence, enqueued, packet, channel, retransmit]
+        self._heap = []
+        # queued entries of each channel in order
+        self._channels = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def channel(packet: bytes) -> bytes:
+        """Return unit id and channel of packet."""
+        return packet[UNIT_ID_SLICE].upper() + packet[CHANNEL_SLICE]
+
+    def put_nowait(self, packet: bytes, priority: int = PRIORITY_NORMAL) -> None:
+        """Queue packet, raise queue.Full if the queue is full and the packet is not urgent."""
+        channel = self.channel(packet)
+        with self._lock:
+            if priority != PRIORITY_URGENT and len(self._heap) >= self.maxsize:
+                raise queue.Full
+            queued = self._channels.setdefault(channel, collections.deque())
+            retransmit = priority == PRIORITY_RETRANSMIT
+            if not retransmit and any(entry[5] for entry in queued):
+                # a retransmit of an older command must not follow a fresh command
+                _LOGGER.debug("Drop queued retransmits of %s", channel)
+                queued = self._channels[channel] = collections.deque(
+                    entry for entry in queued if not entry[5]
+                )
+                self._heap = [entry for entry in self._heap if not (entry[4] == channel and entry[5])]
+                heapq.heapify(self._heap)
+            if queued and priority < queued[-1][0]:
+                # raise the earlier packets of the channel, they leave first
+                for entry in queued:
+                    entry[0] = min(entry[0], priority)
+                heapq.heapify(self._heap)
+            entry = [priority, next(self._sequence), time.monotonic(), packet, channel, retransmit]
+            queued.append(entry)
+            heapq.heappush(self._heap, entry)
+
+    def get_nowait(self) -> Tuple[float, bytes]:
+        """Return enqueue time and packet of the next packet, raise queue.Empty if empty."""
+        with self._lock:
+            if not self._heap:
+                raise queue.Empty
+            _, _, enqueued, packet, channel, _ = heapq.heappop(self._heap)
+            queued = self._channels[channel]
+            queued.popleft()
+            if not queued:
+                del self._channels[channel]
+        return enqueued, packet
+
+    def qsize(self) -> int:
+        """Return number of queued packets."""
+        return len(self._heap)
+
+    def empty(self) -> bool:
+        """Return if no packet is queued."""
+        return not self._heap
+
+
+class AirtimeBudget:
+    """
+    Accounting of the estimated on-air time within a rolling period.
+
+    Each transmitted frame is accounted with FRAME_AIRTIME seconds. A frame may
+    only be sent if the airtime of the last period stays within duty_cycle
+    percent of the period.
+    """
+
+    __slots__ = ("budget", "frame_airtime", "used", "_period", "_frames")
+
+    def __init__(
+        self,
+        duty_cycle: float = DUTY_CYCLE,
+        frame_airtime: float = FRAME_AIRTIME,
+        period: float = AIRTIME_PERIOD,
+    ) -> None:
+        """Initialize budget, duty_cycle 0 disables the limit."""
+        self.budget = period * duty_cycle / 100
+        self.frame_airtime = frame_airtime
+        self.used = 0.0
+        self._period = period
+        self._frames = collections.deque()
+
+    def _expire(self, now: float) -> None:
+        """Remove frames older than the period."""
+        frames = self._frames
+        while frames and frames[0] <= now - self._period:
+            frames.popleft()
+        self.used = len(frames) * self.frame_airtime
+
+    def available(self, now: float) -> bool:
+        """Return if another frame fits into the budget."""
+        self._expire(now)
+        if self.budget <= 0:
+            return True
+        return self.used + self.frame_airtime <= self.budget
+
+    def consume(self, now: float) -> None:
+        """Account a transmitted frame."""
+        self._frames.append(now)
+        self._expire(now)
+
+
 class BeckerCommunicator(threading.Thread):
     """
     Communicator class for Becker centronic USB Stick.
@@ -205,17 +580,37 @@ class BeckerCommunicator(threading.Thread):
         device: str,
         callback: Callable[[re.Match], Any] = None,
         deamon: bool = True,
+        dedup_window: float = DEDUP_WINDOW,
+        duplicate_filter: "DuplicateFilter" = None,
+        duty_cycle: float = DUTY_CYCLE,
     ) -> None:
         '''Initialize communicator'''
         super().__init__(daemon=deamon)
-        # Setup threading stop event and queue
+        # Setup threading stop event and queue, urgent packets are sent first
         self._stop_flag = threading.Event()
-        self._write_queue = queue.Queue(maxsize=100)
+        self._write_queue = TransmitQueue()
+        self._airtime = AirtimeBudget(duty_cycle)
+        self._airtime_exhausted = False
         # Setup callback
         self._callback = callback
-        # Setup interface
-        self._connection = BeckerConnection(device=device)
+        # Setup metrics and interface
+        self.metrics = BeckerMetrics()
+        if device is not None and device.startswith(REPLAY_SCHEME):
+            self._connection = ReplayConnection(device)
+        else:
+            self._connection = BeckerConnection(device=device)
+        self.connection_state = (
+            CONNECTION_CONNECTED if self._connection.is_open else CONNECTION_RECONNECTING
+        )
         self._read_buffer = bytes()
+        self.decoder = PacketDecoder()
+        # Packet of a failed write, will be sent again after re-connect
+        self._pending = None
+        # Last decoded packets and optional capture of raw traffic
+        self.history = PacketHistory()
+        self._capture = None
+        # Duplicate filter for repeated frames, may be shared between communicators
+        self._duplicates = duplicate_filter or DuplicateFilter(dedup_window)
         # timeout will be used within thread only
         self._timeout = time.time()
 
@@ -223,81 +618,202 @@ class BeckerCommunicator(threading.Thread):
         '''Run BeckerCommunicator thread.'''
         _LOGGER.debug('BeckerCommunicator thread started.')
         callback_valid = False if self._callback is None else True    # pylint: disable=simplifiable-if-expression
-        packet = None
         while True:
-            # Read bytes from serial port
-            if callback_valid:
-                data = self._connection.read()
-                if len(data) > 0:
-                    self._timeout = time.time() + COMMUNICATION_TIMEOUT
-                self._read_buffer += data
-                self._parse()
-            # Get packet from write queue if timeout expired
-            if self._timeout < time.time():
-                try:
-                    packet = self._write_queue.get(block=False)
-                except queue.Empty:
-                    pass
-                else:
-                    self._connection.write(packet)
-                    self._timeout = time.time() + COMMUNICATION_TIMEOUT
-                    self._log(packet, "Sent packet: ")
+            try:
+                if not self._connection.is_open:
+                    raise BeckerConnectionError("{} is closed.".format(self._connection.device))
+                self._process(callback_valid)
+            except BeckerConnectionError as err:
+                _LOGGER.error("Connection lost: %s", err)
+                if not self._reconnect():
+                    break
+            except Exception:   # pylint: disable=broad-except
+                # keep thread alive on unexpected errors
+                _LOGGER.exception("Unexpected error in BeckerCommunicator thread")
+                self._connection.close()
+                if not self._reconnect():
+                    break
 
             # Sleep for thread switch and wait time between packets
             time.sleep(0.1)
             # Ensure all packets in queue are send before thread is stopped
-            if self._stop_flag.is_set() and self._write_queue.empty():
+            if self._stop_flag.is_set() and self._pending is None and self._write_queue.empty():
                 break
+        self.connection_state = CONNECTION_CLOSED
         _LOGGER.debug('BeckerCommunicator thread stopped.')
 
+    def _process(self, callback_valid: bool) -> None:
+        """Read and parse received data, send next packet."""
+        metrics = self.metrics
+        # Read bytes from serial port
+        if callback_valid:
+            data = self._connection.read()
+            if len(data) > 0:
+                self._timeout = time.time() + COMMUNICATION_TIMEOUT
+                capture = self._capture
+                if capture is not None:
+                    capture.record(DIRECTION_RX, data)
+                self._read_buffer += data
+                self._parse(time.monotonic())
+        # Queued packets wait while the airtime budget is exhausted
+        now = time.monotonic()
+        exhausted = not self._airtime.available(now)
+        if exhausted and not self._airtime_exhausted:
+            _LOGGER.warning(
+                "Airtime budget of %s seconds per hour exhausted, delay transmission",
+                self._airtime.budget,
+            )
+        self._airtime_exhausted = exhausted
+        # Get packet from write queue if timeout expired
+        if self._timeout < time.time():
+            if self._pending is None and not self._write_queue.empty():
+                if exhausted:
+                    metrics.airtime_wait += 0.1
+                else:
+                    try:
+                        self._pending = self._write_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                    else:
+                        metrics.queue_wait.observe(time.monotonic() - self._pending[0])
+            if self._pending is not None:
+                enqueued, packet = self._pending
+                self._connection.write(packet)
+                self._pending = None
+                self._timeout = time.time() + COMMUNICATION_TIMEOUT
+                self._airtime.consume(now)
+                capture = self._capture
+                if capture is not None:
+                    capture.record(DIRECTION_TX, packet)
+                metrics.frames_sent += 1
+                metrics.enqueue_to_wire.observe(time.monotonic() - enqueued)
+                # sent packets are only decoded for the debug log or on request of the history
+                self.history.add_frame(DIRECTION_TX, packet)
+                if _LOGGER.isEnabledFor(logging.DEBUG):
+                    match = MESSAGE.match(packet)
+                    if match is not None:
+                        self._log(match, "Sent packet: ")
+        elif not self._write_queue.empty():
+            metrics.timeout_wait += 0.1
+        metrics.queue_depth = self._write_queue.qsize()
+        metrics.airtime_used = self._airtime.used
+
+    def _reconnect(self) -> bool:
+        """
+        Re-open connection with exponential backoff.
+
+        Queued packets are kept. Return False if the thread was stopped before
+        the connection could be re-opened.
+        """
+        self.connection_state = CONNECTION_RECONNECTING
+        self._read_buffer = bytes()
+        delay = RECONNECT_DELAY_MIN
+        while not self._stop_flag.is_set():
+            try:
+                self._connection.open()
+            except BeckerConnectionError as err:
+                _LOGGER.debug("Re-connect failed, retry in %s seconds: %s", delay, err)
+            else:
+                _LOGGER.info("Re-connected to %s", self._connection.device)
+                self.metrics.reconnects += 1
+                self.connection_state = CONNECTION_CONNECTED
+                return True
+            self._stop_flag.wait(delay)
+            delay = min(delay * 2, RECONNECT_DELAY_MAX)
+        return False
+
     def stop(self) -> None:
         '''Stop BeckerCommunicator thread.'''
         self._stop_flag.set()
 
-    def _parse(self) -> None:
+    @property
+    def connection(self):
+        """Return connection to the device."""
+        return self._connection
+
+    @property
+    def queue_size(self) -> int:
+        """Return number of packets waiting for transmission."""
+        return self._write_queue.qsize() + (self._pending is not None)
+
+    def start_capture(self, filename: str) -> None:
+        """Start capture of raw traffic to a binary file."""
+        self.stop_capture()
+        _LOGGER.debug("Start capture to %s", filename)
+        self._capture = PacketCapture(filename)
+
+    def stop_capture(self) -> None:
+        """Stop capture of raw traffic."""
+        capture, self._capture = self._capture, None
+        if capture is not None:
+            capture.close()
+            _LOGGER.debug(
+                "Capture to %s stopped, %d records dropped", capture.filename, capture.dropped
+            )
+
+    def _parse(self, received: float) -> None:
         """Parse received packets and run callback."""
-        end = 0
-        for data in MESSAGE.finditer(self._read_buffer):
-            self._log(data.group(0), "Received packet: ")
+        metrics = self.metrics
+        packets, consumed, malformed, unknown, filtered = self.decoder.decode(self._read_buffer)
+        self._read_buffer = self._read_buffer[consumed:]
+        metrics.parse_failures += malformed
+        metrics.unknown_frames += unknown
+        metrics.filtered_frames += filtered
+        for data in packets:
+            metrics.frames_received += 1
+            if data.re is not MESSAGE:
+                # other frame types bypass the remote command path
+                handler = self.decoder.handler(data)
+                if handler is not None:
+                    handler(data)
+                continue
+            if self._duplicates.is_duplicate(data):
+                metrics.suppressed_frames += 1
+                continue
+            self.history.add(DIRECTION_RX, data)
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                self._log(data, "Received packet: ")
             self._callback(data)
-            end = data.end()
-        self._read_buffer = self._read_buffer[end:]
-
-    def _log(self, packet: bytes, text: str = "") -> None:
-        """Log packets."""
-        if _LOGGER.getEffectiveLevel() <= logging.DEBUG:
-            match = MESSAGE.search(packet)
-            if match is not None:
-                if match.group('command') in COMMANDS:
-                    command = COMMANDS[match.group('command')]
-                else:
-                    command = match.group('command').decode()
-                _LOGGER.debug(
-                    "%sunit_id: %s, channel: %s, command: %s, argument: %s, packet: %s",
-                    text,
-                    match.group('unit_id').decode(),
-                    match.group('channel').decode(),
-                    command,
-                    match.group('argument').decode(),
-                    match.group(0),
-                )
-
-    def send(self, packet) -> None:
-        """Send packet."""
+            metrics.wire_to_callback.observe(time.monotonic() - received)
+
+    def _log(self, match: re.Match, text: str = "") -> None:
+        """Log decoded packet."""
+        command = match.group('command')
+        _LOGGER.debug(
+            "%sunit_id: %s, channel: %s, command: %s, argument: %s, packet: %s",
+            text,
+            match.group('unit_id').decode(),
+            match.group('channel').decode(),
+            COMMANDS.get(command) or command.decode(),
+            match.group('argument').decode(),
+            match.group(0),
+        )
+
+    def send(self, packet, priority: int = None) -> None:
+        """
+        Send packet.
+
+        The packets of a channel are sent in order. By default urgent packets
+        like HALT are sent before the queued packets of other channels.
+        Packets wait in the queue while the airtime budget is exhausted. Only
+        packets exceeding the queue size are dropped and counted, urgent packets
+        are always queued and send never blocks.
+        """
         if not self.is_alive():
             raise BeckerConnectionError(
                 "Error BeckerCommunicator thread not alive."
             )
+        if priority is None:
+            priority = PRIORITY_URGENT if packet[COMMAND_SLICE] in URGENT_COMMANDS else PRIORITY_NORMAL
         try:
-            self._write_queue.put(packet, timeout=5)
-        except queue.Full as err:
-            self.stop()
-            raise BeckerConnectionError(
-                "Error sending packet. BeckerCommunicator thread not responding."
-            ) from err
+            self._write_queue.put_nowait(packet, priority)
+        except queue.Full:
+            self.metrics.dropped_frames += 1
+            _LOGGER.error("Transmit queue of %s full, drop packet %s", self._connection.device, packet)
 
     def close(self) -> None:
         """Stop thread and close device"""
         self.stop()
         self.join(timeout=5)
+        self.stop_capture()
         self._connection.close()
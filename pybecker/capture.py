@@ -0,0 +1,183 @@
+"""Binary capture and replay of raw Becker centronic USB Stick traffic."""
+import collections
+import logging
+import struct
+import threading
+import time
+from typing import Callable, Iterator, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+CAPTURE_MAGIC = b'BECKERCAP1\n'
+# timestamp (epoch seconds), direction, length of data
+RECORD = struct.Struct('<dBH')
+
+DIRECTION_TX = 0
+DIRECTION_RX = 1
+
+CAPTURE_SIZE = 4096  # records kept in memory until flushed
+FLUSH_INTERVAL = 1.0
+
+REPLAY_SCHEME = 'replay://'
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PacketCapture:
+    """
+    Capture raw TX/RX data to a binary file.
+
+    Recording only appends a tuple to a bounded ring buffer. A writer thread
+    flushes the ring to disk every FLUSH_INTERVAL seconds. If the writer falls
+    behind, the oldest records are dropped and counted.
+    """
+
+    def __init__(self, filename: str, size: int = CAPTURE_SIZE) -> None:
+        """Open capture file and start writer thread."""
+        self.filename = filename
+        self.dropped = 0
+        self._size = size
+        self._ring = collections.deque(maxlen=size)
+        self._stop_flag = threading.Event()
+        self._file = open(filename, 'wb')   # pylint: disable=consider-using-with
+        self._file.write(CAPTURE_MAGIC)
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    def record(self, direction: int, data: bytes) -> None:
+        """Add data to capture."""
+        if len(self._ring) == self._size:
+            self.dropped += 1
+        self._ring.append((time.time(), direction, data))
+
+    def _run(self) -> None:
+        """Flush ring buffer until stopped."""
+        while not self._stop_flag.wait(FLUSH_INTERVAL):
+            self._flush()
+        self._flush()
+        self._file.close()
+
+    def _flush(self) -> None:
+        """Write all records of the ring buffer to disk."""
+        chunks = []
+        try:
+            while True:
+                timestamp, direction, data = self._ring.popleft()
+                chunks.append(RECORD.pack(timestamp, direction, len(data)))
+                chunks.append(data)
+        except IndexError:
+            pass
+        if chunks:
+            self._file.write(b''.join(chunks))
+            self._file.flush()
+
+    def close(self) -> None:
+        """Flush remaining records and close capture file."""
+        self._stop_flag.set()
+        self._writer.join(timeout=5)
+
+
+def read_capture(filename: str) -> Iterator[Tuple[float, int, bytes]]:
+    """Yield timestamp, direction and data of all records of a capture file."""
+    with open(filename, 'rb') as file:
+        if file.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError("{} is not a Becker capture file".format(filename))
+        while True:
+            header = file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                return
+            timestamp, direction, length = RECORD.unpack(header)
+            yield timestamp, direction, file.read(length)
+
+
+def replay(
+    filename: str,
+    sink: Callable[[int, bytes], None],
+    speed: float = 1.0,
+    directions: Tuple[int, ...] = (DIRECTION_RX,),
+) -> int:
+    """
+    Feed records of a capture file into sink with their original timing.
+
+    The timing is accelerated by speed, 0 replays as fast as possible.
+    Return number of records replayed.
+    """
+    count = 0
+    start = None
+    for timestamp, direction, data in read_capture(filename):
+        if direction not in directions:
+            continue
+        if start is None:
+            start = (timestamp, time.monotonic())
+        if speed > 0:
+            delay = start[1] + (timestamp - start[0]) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        sink(direction, data)
+        count += 1
+    return count
+
+
+class ReplayConnection:
+    """
+    Connection replaying received data of a capture file.
+
+    Can be used instead of BeckerConnection by the device name
+    replay://<filename>?speed=<factor>. Written packets are discarded.
+    """
+
+    def __init__(self, device: str) -> None:
+        """Open capture file."""
+        url = urlsplit(device)
+        self._device = device
+        self._speed = float(parse_qs(url.query).get('speed', ['1'])[0])
+        self._records = (
+            (timestamp, data)
+            for timestamp, direction, data in read_capture(url.netloc + url.path)
+            if direction == DIRECTION_RX
+        )
+        self._next = next(self._records, None)
+        self._start = None
+        self.finished = self._next is None
+
+    @property
+    def is_serial(self) -> bool:
+        """Return if device is serial port."""
+        return False
+
+    @property
+    def device(self) -> str:
+        """Return device name."""
+        return self._device
+
+    @property
+    def is_open(self) -> bool:
+        """Return if connection is open."""
+        return True
+
+    def open(self) -> None:
+        """Nothing to open."""
+
+    def read(self) -> bytes:
+        """Return captured data which is due."""
+        if self._next is None:
+            return bytes()
+        now = time.monotonic()
+        if self._start is None:
+            self._start = (self._next[0], now)
+        chunks = []
+        while self._next is not None:
+            timestamp, data = self._next
+            if self._speed > 0 and self._start[1] + (timestamp - self._start[0]) / self._speed > now:
+                break
+            chunks.append(data)
+            self._next = next(self._records, None)
+        self.finished = self._next is None
+        return b''.join(chunks)
+
+    def write(self, packet: bytes) -> None:
+        """Discard written data."""
+
+    def close(self) -> None:
+        """Stop replay."""
+        self._next = None
+        self.finished = True
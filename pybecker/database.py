@@ -96,6 +96,14 @@ class Database:
         if result is not None:
             return list(result)
 
+    def get_unit_by_code(self, code):
+        c = self.conn.cursor()
+        res = c.execute("SELECT code, increment, configured FROM unit WHERE code = ? COLLATE NOCASE", (code,))
+        result = res.fetchone()
+
+        if result is not None:
+            return list(result)
+
     def get_all_units(self):
         c = self.conn.cursor()
         res = c.execute('SELECT code, increment, configured FROM unit WHERE configured = 1 ORDER BY code ASC')
@@ -0,0 +1,138 @@
+"""Network gateway sharing one Becker centronic USB Stick between several clients."""
+import asyncio
+import collections
+import logging
+import re
+
+from .becker_helper import (
+    COMMUNICATION_TIMEOUT,
+    checksum,
+    finalize_code,
+    hex4,
+)
+
+DEFAULT_PORT = 5000
+# Maximum of buffered bytes for a client, slower clients are disconnected
+CLIENT_BUFFER_LIMIT = 65536
+
+FRAME = re.compile(rb'\x02(?P<code>[0-9A-F]{40})[0-9A-F]{2}\x03', re.I)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class BeckerGateway:
+    """
+    TCP server for a Becker instance.
+
+    Clients use the same STX/ETX framing as the USB stick, e.g. by the device
+    name socket://<host>:<port>. Frames of all clients are sent round-robin,
+    one frame per client and turn, through the single transmit queue of the
+    stick. Received frames are sent to all clients. The rolling increments are
+    taken from the database of the gateway, so that clients sharing a unit
+    never reuse an increment.
+    """
+
+    def __init__(self, host: str = '0.0.0.0', port: int = DEFAULT_PORT) -> None:
+        """Initialize gateway, the Becker instance is attached by start()."""
+        self.host = host
+        self.port = port
+        self.becker = None
+        self._loop = None
+        self._server = None
+        self._clients = {}      # writer: queue of frames to send
+        self._turn = collections.deque()
+        self._pending = None
+
+    def callback(self, packet: re.Match) -> None:
+        """Becker callback for received packets, runs in the communicator thread."""
+        self._loop.call_soon_threadsafe(self._broadcast, packet.group(0))
+
+    async def start(self, becker) -> None:
+        """Start TCP server and scheduler."""
+        self.becker = becker
+        self._loop = asyncio.get_running_loop()
+        self._pending = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        _LOGGER.info("Becker gateway listening on %s:%s", self.host, self.port)
+        self._loop.create_task(self._schedule())
+
+    async def serve_forever(self) -> None:
+        """Serve clients until cancelled."""
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle_client(self, reader, writer) -> None:
+        """Receive frames of a client."""
+        peer = writer.get_extra_info('peername')
+        _LOGGER.info("Client %s connected", peer)
+        self._clients[writer] = collections.deque()
+        self._turn.append(writer)
+        buffer = bytes()
+        try:
+            while True:
+                data = await reader.read(1024)
+                if not data:
+                    break
+                buffer += data
+                end = 0
+                for frame in FRAME.finditer(buffer):
+                    self._clients[writer].append(frame.group('code').decode().upper())
+                    end = frame.end()
+                    self._pending.set()
+                last_etx = buffer.rfind(b'\x03', end)
+                buffer = buffer[max(end, last_etx + 1):]
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            _LOGGER.info("Client %s disconnected", peer)
+            self._clients.pop(writer, None)
+            writer.close()
+
+    async def _schedule(self) -> None:
+        """Feed the transmit queue round-robin with one frame per client."""
+        communicator = self.becker.communicator
+        while True:
+            await self._pending.wait()
+            # Keep the transmit queue short, so that no client can fill it
+            while communicator.queue_size > 0:
+                await asyncio.sleep(COMMUNICATION_TIMEOUT / 3)
+            code = self._next_code()
+            if code is None:
+                self._pending.clear()
+                continue
+            communicator.send(finalize_code(self._renew_increment(code)))
+
+    def _next_code(self):
+        """Return next code of the clients round-robin, None if nothing is pending."""
+        for _ in range(len(self._turn)):
+            writer = self._turn[0]
+            self._turn.rotate(-1)
+            codes = self._clients.get(writer)
+            if codes is None:
+                # client disconnected
+                self._turn.remove(writer)
+                continue
+            if codes:
+                return codes.popleft()
+        return None
+
+    def _renew_increment(self, code: str) -> str:
+        """Replace the increment of code by the next increment of the gateway database."""
+        unit = self.becker.db.get_unit_by_code(code[24:29])
+        if unit is None:
+            # unit unknown to the gateway, send unchanged
+            return checksum(code)
+        increment = max(unit[1], int(code[14:18], 16))
+        unit[1] = increment + 1
+        self.becker.db.set_unit(unit)
+        return checksum(code[:14] + hex4(increment) + code[18:])
+
+    def _broadcast(self, frame: bytes) -> None:
+        """Send received frame to all clients."""
+        for writer in list(self._clients):
+            if writer.transport.get_write_buffer_size() > CLIENT_BUFFER_LIMIT:
+                _LOGGER.warning("Client %s too slow, disconnect", writer.get_extra_info('peername'))
+                self._clients.pop(writer, None)
+                writer.close()
+                continue
+            writer.write(frame)
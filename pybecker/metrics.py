@@ -0,0 +1,134 @@
+"""Transport metrics for Becker centronic USB Stick."""
+from bisect import bisect_left
+import time
+
+# Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (
+    0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets.
+
+    Observing a value is a bisect and a few additions, cheap enough to be
+    always enabled.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "total", "max")
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS) -> None:
+        """Initialize histogram."""
+        self.buckets = buckets
+        # last count is for values above the last bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add a value in seconds."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> float:
+        """Return upper bucket bound of percentile (0 - 100)."""
+        if self.count == 0:
+            return 0.0
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        """Return histogram summary."""
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": dict(
+                zip([str(bound) for bound in self.buckets] + ["inf"], self.counts)
+            ),
+        }
+
+
+class BeckerMetrics:
+    """Counters and latency histograms of one Becker connection."""
+
+    __slots__ = (
+        "started",
+        "frames_sent",
+        "frames_received",
+        "parse_failures",
+        "unknown_frames",
+        "suppressed_frames",
+        "filtered_frames",
+        "dropped_frames",
+        "reconnects",
+        "queue_depth",
+        "timeout_wait",
+        "airtime_used",
+        "airtime_wait",
+        "queue_wait",
+        "enqueue_to_wire",
+        "wire_to_callback",
+        "db_write",
+    )
+
+    def __init__(self) -> None:
+        """Initialize metrics."""
+        self.started = time.time()
+        self.frames_sent = 0
+        self.frames_received = 0
+        self.parse_failures = 0
+        self.unknown_frames = 0
+        self.suppressed_frames = 0
+        # frames of unknown senders
+        self.filtered_frames = 0
+        # frames dropped by a full transmit queue
+        self.dropped_frames = 0
+        self.reconnects = 0
+        self.queue_depth = 0
+        # seconds a queued packet waited for COMMUNICATION_TIMEOUT
+        self.timeout_wait = 0.0
+        # estimated seconds on air within the last hour
+        self.airtime_used = 0.0
+        # seconds a queued packet waited for the airtime budget
+        self.airtime_wait = 0.0
+        # seconds from enqueue to dequeue of a packet
+        self.queue_wait = Histogram()
+        self.enqueue_to_wire = Histogram()
+        self.wire_to_callback = Histogram()
+        self.db_write = Histogram()
+
+    def as_dict(self) -> dict:
+        """Return all metrics as JSON serializable dict."""
+        return {
+            "uptime": time.time() - self.started,
+            "frames_sent": self.frames_sent,
+            "frames_received": self.frames_received,
+            "parse_failures": self.parse_failures,
+            "unknown_frames": self.unknown_frames,
+            "suppressed_frames": self.suppressed_frames,
+            "filtered_frames": self.filtered_frames,
+            "dropped_frames": self.dropped_frames,
+            "reconnects": self.reconnects,
+            "queue_depth": self.queue_depth,
+            "timeout_wait": self.timeout_wait,
+            "airtime_used": self.airtime_used,
+            "airtime_wait": self.airtime_wait,
+            "queue_wait": self.queue_wait.as_dict(),
+            "enqueue_to_wire": self.enqueue_to_wire.as_dict(),
+            "wire_to_callback": self.wire_to_callback.as_dict(),
+            "db_write": self.db_write.as_dict(),
+        }
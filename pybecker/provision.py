@@ -0,0 +1,76 @@
+"""Persistent progress of bulk pairing (provisioning) of several channels."""
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+# Seconds to wait before the pairing of each channel, the operator puts its
+# receiver into pairing mode meanwhile
+PROVISION_GAP = 30.0
+
+STATUS_SENT = 'sent'
+STATUS_INVALID = 'invalid'
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def progress_filename(db_filename: str) -> str:
+    """Return default progress file next to the database file."""
+    return os.path.splitext(db_filename)[0] + '.provision.json'
+
+
+class ProvisionProgress:
+    """
+    Results of a provisioning run stored in a JSON file.
+
+    The file is rewritten after each channel, so that an interrupted run
+    resumes with the first channel whose pairing frames were not sent.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """Load results of a previous run, if any."""
+        self.filename = filename
+        self.results = {}   # channel: {'status': ..., 'time': ...}
+        try:
+            with open(filename, encoding='utf-8') as file:
+                self.results = json.load(file).get('channels', {})
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError):
+            _LOGGER.warning("Ignore invalid provisioning progress file %s", filename)
+
+    def pending(self, channels: Iterable[str]) -> List[str]:
+        """Return channels not sent yet, in the given order and without duplicates."""
+        return [
+            channel for channel in dict.fromkeys(channels)
+            if self.status(channel) != STATUS_SENT
+        ]
+
+    def status(self, channel: str) -> Optional[str]:
+        """Return status of channel, None if not provisioned yet."""
+        return self.results.get(channel, {}).get('status')
+
+    def record(self, channel: str, status: str) -> None:
+        """Store the result of a channel."""
+        self.results[channel] = {'status': status, 'time': round(time.time(), 3)}
+        self.save()
+
+    def reset(self) -> None:
+        """Forget all results, the next run starts from scratch."""
+        self.results = {}
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
+
+    def save(self) -> None:
+        """Write results atomically, an interruption never leaves a truncated file."""
+        temp = self.filename + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as file:
+            json.dump({'channels': self.results}, file, indent=2)
+        os.replace(temp, self.filename)
+
+    def as_dict(self) -> Dict[str, dict]:
+        """Return results of all channels."""
+        return dict(self.results)
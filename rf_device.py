@@ -1,44 +1,157 @@
 """Handling of the Becker USB device."""
 
-import codecs
 import logging
 import os
+import threading
+import time
 
 import voluptuous as vol
 
-from homeassistant.helpers.dispatcher import dispatcher_send
+from homeassistant.const import CONF_DEVICE
+from homeassistant.core import SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 
 from .pybecker.becker import Becker
+from .pybecker.becker_helper import DEDUP_WINDOW, DEFAULT_DEVICE_NAME, DUTY_CYCLE
 from .pybecker.database import FILE_PATH, SQL_DB_FILE
+from .pybecker.provision import PROVISION_GAP
 
 from .const import (
     COMMANDS,
     CONF_CHANNEL,
+    CONF_CHANNELS,
+    CONF_GAP,
+    CONF_RESTART,
     CONF_UNIT,
     DOMAIN,
     RECEIVE_MESSAGE,
     REMOTE_PACKET_EVENT,
+    SENDER_FILTER_DROP,
+    SENDER_FILTER_EVENTS,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+# Reverse lookup of received command codes
+COMMAND_NAMES = {cmd: name for name, cmd in COMMANDS.items()}
+
 PAIR_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_CHANNEL): vol.All(int, vol.Range(min=1, max=7)),
         vol.Optional(CONF_UNIT): vol.All(int, vol.Range(min=1, max=5)),
+        vol.Optional(CONF_DEVICE): cv.string,
+    }
+)
+
+PROVISION_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_CHANNELS): vol.All(
+            cv.ensure_list, [vol.Match(r'^[1-5]:[1-7]$', msg="Channel must be unit:channel like 1:2")]
+        ),
+        vol.Optional(CONF_GAP, default=PROVISION_GAP): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_RESTART, default=False): cv.boolean,
+        vol.Optional(CONF_DEVICE): cv.string,
+    }
+)
+
+DEVICE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_DEVICE): cv.string,
     }
 )
 
 
 class PyBecker:
-    """Manages a (single, global) pybecker Becker instance."""
+    """Manages pybecker Becker instances, one for each device."""
 
-    becker = None
+    # Registry of all instances by device
+    instances = {}
 
-    @classmethod
-    def setup(cls, hass, device=None, filename=None):
+    def __init__(
+        self, hass, device, filename, becker_kwargs, coalesce_events, sender_filter=None, name=None,
+    ):
         """Initiate becker instance."""
-        # Validate filename
+        self.hass = hass
+        self.device = device
+        self.name = name
+        self.filename = filename
+        self.coalesce_events = coalesce_events
+        # Unit ids of remotes known by covers
+        self.sender_filter = sender_filter
+        self.senders = set()
+        self.sensors_loaded = False
+        # Named devices use their name as prefix of the unique ids, the unnamed
+        # device keeps the unique ids of a single device setup
+        self.unique_prefix = f"{name}:" if name else ""
+        self.receive_signal = f"{DOMAIN}.{RECEIVE_MESSAGE}.{device}"
+        # Received packets waiting for delivery to the event loop
+        self._packets = []
+        self._packets_lock = threading.Lock()
+        self._last_event_frame = None
+        # Setup Becker
+        self.becker = Becker(
+            device_name=device, init_dummy=False,
+            db_filename=filename, callback=self.receive_callback,
+            **becker_kwargs,
+        )
+
+    @classmethod
+    def setup(
+        cls, hass, device=None, filename=None, coalesce_events=False,
+        dedup_window=DEDUP_WINDOW, shards=None, duty_cycle=DUTY_CYCLE, sender_filter=None,
+        name=None,
+    ):
+        """Return becker instance of device, create it if required."""
+        device = device or DEFAULT_DEVICE_NAME
+        filename = cls._validate_filename(hass, filename)
+        instance = cls.instances.get(device)
+        if instance is not None:
+            if instance.filename != filename:
+                _LOGGER.error(
+                    "Device %s is already used with filename %s. Ignore filename %s.",
+                    device, instance.filename, filename,
+                )
+            return instance
+        for instance in cls.instances.values():
+            if instance.name == name:
+                raise HomeAssistantError(
+                    f"Becker devices {instance.device} and {device} use the same name {name}. "
+                    "Configure a unique name for all devices except one."
+                )
+            if instance.filename == filename:
+                _LOGGER.warning(
+                    "Filename %s is used by device %s and %s. Use a separate file for each device.",
+                    filename, instance.device, device,
+                )
+        instance = cls(
+            hass, device, filename,
+            {'dedup_window': dedup_window, 'shards': shards, 'duty_cycle': duty_cycle},
+            coalesce_events, sender_filter, name,
+        )
+        cls.instances[device] = instance
+        return instance
+
+    @classmethod
+    def get(cls, device=None):
+        """Return becker instance of device or name, the unnamed instance if device is None."""
+        if device is None:
+            instance = next(
+                (instance for instance in cls.instances.values() if instance.name is None),
+                next(iter(cls.instances.values()), None),
+            )
+        else:
+            instance = cls.instances.get(device) or next(
+                (instance for instance in cls.instances.values() if instance.name == device), None
+            )
+        if instance is None:
+            raise HomeAssistantError(f"No Becker device {device or ''} configured")
+        return instance
+
+    @staticmethod
+    def _validate_filename(hass, filename):
+        """Return validated filename of database."""
         if filename is None:
             filename = SQL_DB_FILE
         if not os.path.isfile(filename):
@@ -63,17 +176,22 @@ class PyBecker:
                 # create a new file
                 _LOGGER.warning("Filename %s does not exist. Create a new file.", filename)
         _LOGGER.debug("Use filename: %s", filename)
-        # Setup callback function
-        callback = lambda packet: cls.callback(hass, packet)
-        # Setup Becker
-        cls.becker = Becker(device_name=device, init_dummy=False, db_filename=filename, callback=callback)
+        return filename
 
     @classmethod
     async def async_register_services(cls, hass):
         """Register component services."""
 
         hass.services.async_register(DOMAIN, "pair", cls.handle_pair, PAIR_SCHEMA)
-        hass.services.async_register(DOMAIN, "log_units", cls.handle_log_units)
+        hass.services.async_register(
+            DOMAIN, "provision", cls.handle_provision, PROVISION_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
+        hass.services.async_register(DOMAIN, "log_units", cls.handle_log_units, DEVICE_SCHEMA)
+        hass.services.async_register(
+            DOMAIN, "log_packets", cls.handle_log_packets, DEVICE_SCHEMA,
+            supports_response=SupportsResponse.OPTIONAL,
+        )
 
     @classmethod
     async def handle_pair(cls, call):
@@ -81,13 +199,22 @@ class PyBecker:
 
         channel = call.data.get(CONF_CHANNEL)
         unit = call.data.get(CONF_UNIT, 1)
-        await cls.becker.pair(f"{unit}:{channel}")
+        await cls.get(call.data.get(CONF_DEVICE)).becker.pair(f"{unit}:{channel}")
+
+    @classmethod
+    async def handle_provision(cls, call):
+        """Service to pair several cover receivers in a row."""
+        results = await cls.get(call.data.get(CONF_DEVICE)).becker.provision(
+            call.data[CONF_CHANNELS],
+            call.data[CONF_GAP],
+            restart=call.data[CONF_RESTART],
+        )
+        return {"channels": results}
 
     @classmethod
     async def handle_log_units(cls, call):
         """Service that logs all paired units."""
-        units = await cls.becker.list_units()
-
+        units = await cls.get(call.data.get(CONF_DEVICE)).becker.list_units()
         # Apparently the SQLite results are implicitly returned in unit id
         # order. This seems pretty dirty to rely on.
         unit_id = 1
@@ -99,20 +226,74 @@ class PyBecker:
             )
             unit_id += 1
 
-    @staticmethod
-    def callback(hass, packet):
-        """Handle Becker device callback for received packets."""
-        _LOGGER.debug("Received packet for dispatcher")
-        dispatcher_send(hass, f"{DOMAIN}.{RECEIVE_MESSAGE}", packet)
-
-        # Also fire an explicit event that external applications can listen to
-        # if that is of use to them.
-        data = {
-            "unit": codecs.decode(packet.group("unit_id"), "ascii"),
-            "channel": codecs.decode(packet.group("channel"), "ascii"),
-        }
-        command = packet.group("command") + b"0"
-        command_name = [nm for nm, cmd in COMMANDS.items() if cmd == command]
-        if command_name:
-            data["command"] = command_name[0]
-        hass.bus.fire(f"{DOMAIN}_{REMOTE_PACKET_EVENT}", data)
+    @classmethod
+    async def handle_log_packets(cls, call):
+        """Service that logs and returns the last sent and received packets."""
+        packets = cls.get(call.data.get(CONF_DEVICE)).becker.recent_packets()
+        _LOGGER.info("Last %d Becker centronic packets:", len(packets))
+        for packet in packets:
+            _LOGGER.info(
+                "%s %s unit_id: %s, channel: %s, command: %s, argument: %s, increment: %d",
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(packet["timestamp"])),
+                packet["direction"].upper(),
+                packet["unit_id"],
+                packet["channel"],
+                packet["command"],
+                packet["argument"],
+                packet["increment"],
+            )
+        return {"packets": packets}
+
+    def add_senders(self, unit_ids):
+        """Add unit ids of remotes known by covers to the sender filter."""
+        self.senders.update(unit_id.upper() for unit_id in unit_ids)
+        if self.sender_filter == SENDER_FILTER_DROP:
+            self.becker.set_senders(self.senders)
+
+    def receive_callback(self, packet):
+        """Handle Becker device callback for received packets.
+
+        Runs in the communicator thread. Packets are collected and the whole
+        batch is handed over to the event loop at once.
+        """
+        with self._packets_lock:
+            self._packets.append(packet)
+            if len(self._packets) > 1:
+                # delivery of this batch is already scheduled
+                return
+        self.hass.loop.call_soon_threadsafe(self.async_process_packets)
+
+    @callback
+    def async_process_packets(self):
+        """Dispatch a batch of received packets within the event loop."""
+        with self._packets_lock:
+            packets, self._packets = self._packets, []
+        _LOGGER.debug("Received %d packet(s) for dispatcher", len(packets))
+        for packet in packets:
+            if (
+                self.sender_filter == SENDER_FILTER_EVENTS
+                and self.senders
+                and packet.group("unit_id").upper() not in self.senders
+            ):
+                # unknown sender, fire the event for discovery only
+                self.becker.metrics.filtered_frames += 1
+            else:
+                async_dispatcher_send(self.hass, self.receive_signal, packet)
+
+            # Repeated frames of the same button press are identical
+            if self.coalesce_events:
+                frame = packet.group(0)
+                if frame == self._last_event_frame:
+                    continue
+                self._last_event_frame = frame
+
+            # Also fire an explicit event that external applications can listen to
+            # if that is of use to them.
+            data = {
+                "unit": packet.group("unit_id").decode(),
+                "channel": packet.group("channel").decode(),
+            }
+            command_name = COMMAND_NAMES.get(packet.group("command") + b"0")
+            if command_name is not None:
+                data["command"] = command_name
+            self.hass.bus.async_fire(f"{DOMAIN}_{REMOTE_PACKET_EVENT}", data)
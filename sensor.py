@@ -0,0 +1,119 @@
+"""Diagnostic sensors for the Becker USB device."""
+
+import logging
+import os
+from urllib.parse import urlsplit
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import CONF_DEVICE, EntityCategory, UnitOfTime
+
+from .const import DOMAIN, MANUFACTURER
+from .rf_device import PyBecker
+
+_LOGGER = logging.getLogger(__name__)
+
+# metric: (name, unit, state class)
+METRIC_SENSORS = {
+    'frames_sent': ("Frames sent", None, SensorStateClass.TOTAL_INCREASING),
+    'frames_received': ("Frames received", None, SensorStateClass.TOTAL_INCREASING),
+    'parse_failures': ("Parse failures", None, SensorStateClass.TOTAL_INCREASING),
+    'unknown_frames': ("Unknown frames", None, SensorStateClass.TOTAL_INCREASING),
+    'suppressed_frames': ("Suppressed frames", None, SensorStateClass.TOTAL_INCREASING),
+    'filtered_frames': ("Filtered frames", None, SensorStateClass.TOTAL_INCREASING),
+    'dropped_frames': ("Dropped frames", None, SensorStateClass.TOTAL_INCREASING),
+    'reconnects': ("Reconnects", None, SensorStateClass.TOTAL_INCREASING),
+    'queue_depth': ("Queue depth", None, SensorStateClass.MEASUREMENT),
+    'timeout_wait': ("Timeout wait", UnitOfTime.SECONDS, SensorStateClass.TOTAL_INCREASING),
+    'airtime_used': ("Airtime used", UnitOfTime.SECONDS, SensorStateClass.MEASUREMENT),
+    'airtime_wait': ("Airtime wait", UnitOfTime.SECONDS, SensorStateClass.TOTAL_INCREASING),
+    'queue_wait': ("Queue wait", UnitOfTime.SECONDS, SensorStateClass.MEASUREMENT),
+    'enqueue_to_wire': ("Enqueue to wire", UnitOfTime.SECONDS, SensorStateClass.MEASUREMENT),
+    'wire_to_callback': ("Wire to callback", UnitOfTime.SECONDS, SensorStateClass.MEASUREMENT),
+    'db_write': ("Database write", UnitOfTime.SECONDS, SensorStateClass.MEASUREMENT),
+}
+# Database writes are measured once for all devices
+SHARD_EXCLUDED_METRICS = ('db_write',)
+
+
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
+    """Set up the becker diagnostic sensors."""
+    if discovery_info is None:
+        return
+    pybecker = PyBecker.get(discovery_info[CONF_DEVICE])
+    prefix = pybecker.unique_prefix
+    # sensor names of named devices contain the name of the device
+    label = f"{MANUFACTURER} {pybecker.name}" if pybecker.name else MANUFACTURER
+    becker = pybecker.becker
+    sensors = [BeckerConnectionSensor(becker.communicator, prefix, label)]
+    sensors.extend(
+        BeckerMetricSensor(becker.metrics, prefix, label, metric, *spec)
+        for metric, spec in METRIC_SENSORS.items()
+    )
+    # Each shard reports its own connection state and metrics
+    for device, communicator in becker.communicators.items():
+        if communicator is becker.communicator:
+            continue
+        shard_prefix = f"{prefix}shard_{device}_"
+        shard_label = f"{label} Shard {shard_name(device)}"
+        sensors.append(BeckerConnectionSensor(communicator, shard_prefix, shard_label))
+        sensors.extend(
+            BeckerMetricSensor(communicator.metrics, shard_prefix, shard_label, metric, *spec)
+            for metric, spec in METRIC_SENSORS.items()
+            if metric not in SHARD_EXCLUDED_METRICS
+        )
+    async_add_entities(sensors)
+
+
+def shard_name(device):
+    """Return short name of shard device, host and port of a gateway or the serial port."""
+    return urlsplit(device).netloc or os.path.basename(device)
+
+
+class BeckerConnectionSensor(SensorEntity):
+    """Representation of the connection state of a Becker device."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, communicator, prefix, label):
+        """Init the Becker connection sensor."""
+        self._communicator = communicator
+        self._attr_name = f"{label} Connection"
+        self._attr_unique_id = f"{DOMAIN}_{prefix}connection"
+
+    @property
+    def native_value(self):
+        """Return the connection state."""
+        return self._communicator.connection_state
+
+
+class BeckerMetricSensor(SensorEntity):
+    """Representation of a Becker transport metric."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, metrics, prefix, label, metric, name, unit, state_class):
+        """Init the Becker metric sensor."""
+        self._metrics = metrics
+        self._metric = metric
+        self._attr_name = f"{label} {name}"
+        self._attr_unique_id = f"{DOMAIN}_{prefix}{metric}"
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+
+    @property
+    def native_value(self):
+        """Return the current value of the metric. Histograms report the average."""
+        value = getattr(self._metrics, self._metric)
+        if isinstance(value, (int, float)):
+            return round(value, 3)
+        return round(value.total / value.count, 3) if value.count else 0
+
+    @property
+    def extra_state_attributes(self):
+        """Return the summary of histogram metrics."""
+        value = getattr(self._metrics, self._metric)
+        if isinstance(value, (int, float)):
+            return None
+        summary = value.as_dict()
+        summary.pop('buckets')
+        return summary
@@ -0,0 +1,6 @@
+"""Test configuration, the tests run without Home Assistant."""
+import os
+import sys
+
+# travelcalculator and pybecker are imported from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,95 @@
+"""Tests of the command sequences sent by Becker."""
+import asyncio
+from unittest import mock
+
+import pytest
+
+from pybecker.becker import SEQUENCES, Becker, register_sequence
+from pybecker.becker_helper import finalize_code, generate_code
+from pybecker.capture import CAPTURE_MAGIC, REPLAY_SCHEME
+
+UNIT_ID = '1737B'
+INCREMENT = 0x1E
+CHANNEL = 3
+
+# frames of the built-in commands as sent before the sequences were compiled,
+# (command, increment offset) and the increments used
+BUILT_IN = {
+    'UP': ([(0x20, 0)], 1),
+    'UP2': ([(0x24, 0)], 1),
+    'HALT': ([(0x10, 0)], 1),
+    'RELEASE': ([(0x00, 0)], 1),
+    'DOWN': ([(0x40, 0)], 1),
+    'DOWN2': ([(0x44, 0)], 1),
+    'TRAIN': ([(0x81, 0), (0x00, 1), (0x81, 2)], 3),
+    'CLEARPOS': ([(0x80, 0), (0x90, 1), (0x91, 2), (0x92, 3), (0x93, 4)], 5),
+    'REMOVE': ([(0x81, 0), (0x00, 1), (0x81, 2), (0x82, 3), (0x83, 4)], 5),
+    'TRAINMASTER': ([(0x80, 0), (0x81, 1), (0x82, 2), (0x83, 3)], 4),
+}
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Becker replaying an empty capture, sent frames are collected instead of queued."""
+    capture = tmp_path / 'empty.cap'
+    capture.write_bytes(CAPTURE_MAGIC)
+    becker = Becker(
+        device_name=f"{REPLAY_SCHEME}{capture}", db_filename=str(tmp_path / 'centronic-stick.db')
+    )
+    becker.sent = []
+    becker.communicator.send = lambda packet, priority=None: becker.sent.append(packet)
+    yield becker
+    becker.close()
+
+
+def run(client, cmd, configured=1):
+    """Run command on a unit, return the unit and the mocked asyncio.sleep."""
+    unit = [UNIT_ID, INCREMENT, configured]
+    with mock.patch('pybecker.becker.asyncio.sleep', new=mock.AsyncMock()) as sleep:
+        asyncio.run(client.run_codes(CHANNEL, unit, cmd, True))
+    return unit, sleep
+
+
+def frames(steps):
+    """Return framed packets of (command, increment offset) steps."""
+    return [
+        finalize_code(generate_code(CHANNEL, (UNIT_ID, INCREMENT + offset), command))
+        for command, offset in steps
+    ]
+
+
+@pytest.mark.parametrize('cmd', sorted(BUILT_IN))
+def test_built_in_commands(client, cmd):
+    steps, length = BUILT_IN[cmd]
+    unit, sleep = run(client, cmd)
+    assert client.sent == frames(steps)
+    assert unit[1] == INCREMENT + length
+    assert not sleep.await_args_list
+
+
+def test_pairing_configures_unit(client):
+    unit, _ = run(client, 'UP', configured=0)
+    assert not client.sent
+    assert unit[1] == INCREMENT
+    unit, _ = run(client, 'TRAIN', configured=0)
+    assert client.sent == frames(BUILT_IN['TRAIN'][0])
+    assert unit[2] == 1
+
+
+@pytest.mark.parametrize('cmd, command', [('UP:7', 0x20), ('DOWN:12', 0x40)])
+def test_timed_moves(client, cmd, command):
+    unit, sleep = run(client, cmd)
+    assert client.sent == frames([(command, 0), (0x10, 1)])
+    assert sleep.await_args_list == [mock.call(int(cmd.split(':')[1]))]
+    assert unit[1] == INCREMENT + 2
+
+
+def test_registered_sequence(client):
+    register_sequence('UPHALT', [(0x20, 2.5), 0x10, 0x00])
+    try:
+        unit, sleep = run(client, 'UPHALT')
+    finally:
+        del SEQUENCES['UPHALT']
+    assert client.sent == frames([(0x20, 0), (0x10, 1), (0x00, 2)])
+    assert sleep.await_args_list == [mock.call(2.5)]
+    assert unit[1] == INCREMENT + 3
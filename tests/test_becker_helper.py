@@ -0,0 +1,236 @@
+"""Tests of the helpers of the Becker centronic USB Stick."""
+import queue
+import re
+from unittest import mock
+
+import pytest
+
+from pybecker.becker_helper import (
+    AIRTIME_PERIOD,
+    DIRECTION_RX,
+    DIRECTION_TX,
+    ETX,
+    MESSAGE,
+    PRIORITY_RETRANSMIT,
+    PRIORITY_URGENT,
+    BeckerCommunicator,
+    DuplicateFilter,
+    PacketDecoder,
+    PacketHistory,
+    STX,
+    TransmitQueue,
+    checksum,
+    finalize_code,
+    generate_code,
+)
+from pybecker.capture import CAPTURE_MAGIC, REPLAY_SCHEME
+
+
+def frame(channel=1, increment=0x1E, command=0x20, unit_id='12345'):
+    """Return framed packet."""
+    return finalize_code(generate_code(channel, (unit_id, increment), command))
+
+
+def test_history_decodes_sent_frames_on_request():
+    history = PacketHistory(2)
+    history.add_frame(DIRECTION_TX, frame(increment=1))
+    history.add(DIRECTION_RX, MESSAGE.match(frame(channel=2, increment=2, command=0x10)))
+    history.add_frame(DIRECTION_TX, frame(increment=3, command=0x40))
+    packets = history.packets()
+    assert [(p['direction'], p['channel'], p['command'], p['increment']) for p in packets] == [
+        ('rx', '2', 'HALT', 2),
+        ('tx', '1', 'DOWN', 3),
+    ]
+
+
+def test_history_skips_undecodable_sent_frames():
+    history = PacketHistory()
+    history.add_frame(DIRECTION_TX, b'\x02garbage\x03')
+    assert not history.packets()
+
+
+def duplicates(duplicate_filter, frames):
+    """Return results of the filter for (time, frame) pairs."""
+    results = []
+    for now, packet in frames:
+        with mock.patch('pybecker.becker_helper.time.monotonic', return_value=now):
+            results.append(duplicate_filter.is_duplicate(MESSAGE.match(packet)))
+    return results
+
+
+def test_duplicate_filter_suppresses_repeat_within_window():
+    assert duplicates(DuplicateFilter(0.5), [
+        (10.0, frame()), (10.2, frame()), (11.0, frame()),
+    ]) == [False, True, False]
+
+
+def test_duplicate_filter_suppresses_held_button():
+    # repeats every 0.3 seconds, for longer than the window in total
+    held = [(10.0 + 0.3 * i, frame()) for i in range(10)]
+    assert duplicates(DuplicateFilter(0.5), held) == [False] + [True] * 9
+
+
+def test_duplicate_filter_passes_new_increment_or_command():
+    assert duplicates(DuplicateFilter(0.5), [
+        (10.0, frame(increment=1)),
+        (10.1, frame(increment=2)),
+        (10.2, frame(increment=2, command=0x10)),
+        (10.3, frame(increment=2, command=0x10, channel=2)),
+        (10.4, frame(increment=2, command=0x10, unit_id='ABCDE')),
+    ]) == [False] * 5
+
+
+def test_duplicate_filter_disabled_by_zero_window():
+    assert duplicates(DuplicateFilter(0), [(10.0, frame()), (10.0, frame())]) == [False, False]
+
+
+def test_decoder_counts_skipped_frames_and_keeps_partial_frame():
+    decoder = PacketDecoder()
+    unknown = finalize_code(checksum('0000000003020B' + '0' * 26))
+    truncated = frame(increment=2)[:20]
+    malformed = frame(increment=3)[:30] + ETX
+    buffer = frame(increment=1) + unknown + truncated + malformed + frame(increment=4) + STX + b'0000'
+    packets, consumed, malformed, unknown, filtered = decoder.decode(buffer)
+    assert [int(packet.group('increment'), 16) for packet in packets] == [1, 4]
+    assert buffer[consumed:] == STX + b'0000'
+    assert (malformed, unknown, filtered) == (2, 1, 0)
+    assert decoder.unknown_headers == {b'0000000003020B': 1}
+
+
+def test_decoder_dispatches_registered_frame_types():
+    decoder = PacketDecoder()
+    decoder.register(b'0000000003020B', re.compile(STX + rb'0000000003020B(?P<status>[0-9A-F]{2})[0-9A-F]*' + ETX))
+    status = finalize_code(checksum('0000000003020B' + '42' + '0' * 24))
+    packets, _, malformed, unknown, _ = decoder.decode(frame(increment=1) + status + frame(increment=2))
+    assert [packet.groupdict().get('status') for packet in packets] == [None, b'42', None]
+    assert (malformed, unknown) == (0, 0)
+
+
+def test_communicator_passes_registered_frame_types_to_their_handler(tmp_path):
+    capture = tmp_path / 'empty.cap'
+    capture.write_bytes(CAPTURE_MAGIC)
+    received = []
+    statuses = []
+    communicator = BeckerCommunicator(f"{REPLAY_SCHEME}{capture}", callback=received.append)
+    communicator.decoder.register(
+        b'0000000003020B', re.compile(STX + rb'0000000003020B[0-9A-F]*' + ETX), statuses.append
+    )
+    status = finalize_code(checksum('0000000003020B' + '0' * 26))
+    communicator._read_buffer = frame(increment=1) + status + status  # pylint: disable=protected-access
+    communicator._parse(0.0)  # pylint: disable=protected-access
+    assert [packet.group(0) for packet in received] == [frame(increment=1)]
+    assert [packet.group(0) for packet in statuses] == [status, status]
+    assert [packet['increment'] for packet in communicator.history.packets()] == [1]
+    assert communicator.metrics.frames_received == 3
+    assert communicator.metrics.suppressed_frames == 0
+
+
+def test_decoder_filters_remote_frames_of_other_senders():
+    decoder = PacketDecoder()
+    decoder.register(b'0000000003020B', re.compile(STX + rb'0000000003020B[0-9A-F]*' + ETX))
+    status = finalize_code(checksum('0000000003020B' + '0' * 26))
+    buffer = frame(increment=1) + frame(increment=2, unit_id='ABCDE') + status
+    decoder.senders = frozenset()
+    packets, _, _, _, filtered = decoder.decode(buffer)
+    assert (len(packets), filtered) == (3, 0)
+    decoder.senders = frozenset([b'12345'])
+    matched = []
+
+    class Parser:
+        """MESSAGE recording the frames it runs on."""
+
+        @staticmethod
+        def match(string, pos, endpos):
+            matched.append(string[pos:endpos])
+            return MESSAGE.match(string, pos, endpos)
+
+    decoder._parsers[b'0000000002010B'] = Parser  # pylint: disable=protected-access
+    packets, _, _, _, filtered = decoder.decode(buffer)
+    assert [packet.group(0) for packet in packets] == [frame(increment=1), status]
+    assert filtered == 1
+    assert matched == [frame(increment=1)]
+
+
+def drain(transmit_queue):
+    """Return increments and channels of all queued packets in sending order."""
+    sent = []
+    while not transmit_queue.empty():
+        packet = MESSAGE.match(transmit_queue.get_nowait()[1])
+        sent.append((int(packet.group('channel'), 16), int(packet.group('increment'), 16)))
+    return sent
+
+
+def test_halt_overtakes_other_channels_only():
+    transmit_queue = TransmitQueue()
+    transmit_queue.put_nowait(frame(channel=1, increment=1))
+    transmit_queue.put_nowait(frame(channel=2, increment=2))
+    transmit_queue.put_nowait(frame(channel=1, increment=3, command=0x10), PRIORITY_URGENT)
+    transmit_queue.put_nowait(frame(channel=3, increment=4, command=0x10), PRIORITY_URGENT)
+    assert drain(transmit_queue) == [(1, 1), (1, 3), (3, 4), (2, 2)]
+
+
+def test_fresh_packet_supersedes_queued_retransmits():
+    transmit_queue = TransmitQueue()
+    transmit_queue.put_nowait(frame(channel=1, increment=1), PRIORITY_RETRANSMIT)
+    transmit_queue.put_nowait(frame(channel=2, increment=2), PRIORITY_RETRANSMIT)
+    transmit_queue.put_nowait(frame(channel=1, increment=3, command=0x40))
+    assert transmit_queue.qsize() == 2
+    assert drain(transmit_queue) == [(1, 3), (2, 2)]
+
+
+def test_full_queue_raises_without_blocking():
+    transmit_queue = TransmitQueue(maxsize=2)
+    transmit_queue.put_nowait(frame(increment=1))
+    transmit_queue.put_nowait(frame(increment=2))
+    with pytest.raises(queue.Full):
+        transmit_queue.put_nowait(frame(increment=3))
+    assert transmit_queue.qsize() == 2
+
+
+def test_exhausted_budget_delays_halt_without_dropping(tmp_path):
+    capture = tmp_path / 'empty.cap'
+    capture.write_bytes(CAPTURE_MAGIC)
+    communicator = BeckerCommunicator(f"{REPLAY_SCHEME}{capture}")
+    airtime = communicator._airtime  # pylint: disable=protected-access
+    while airtime.available(1000.0):
+        airtime.consume(1000.0)
+    with mock.patch.object(communicator, 'is_alive', return_value=True):
+        communicator.send(frame(command=0x10))
+    with mock.patch('pybecker.becker_helper.time.monotonic', return_value=1001.0):
+        communicator._process(False)  # pylint: disable=protected-access
+    assert communicator.queue_size == 1
+    assert communicator.metrics.frames_sent == 0
+    assert communicator.metrics.airtime_wait > 0
+    # the frames of the budget leave the rolling hour
+    with mock.patch('pybecker.becker_helper.time.monotonic', return_value=1000.0 + AIRTIME_PERIOD):
+        communicator._process(False)  # pylint: disable=protected-access
+    assert communicator.queue_size == 0
+    assert communicator.metrics.frames_sent == 1
+    assert communicator.metrics.dropped_frames == 0
+
+
+def test_full_queue_drops_packets_except_halt(tmp_path):
+    capture = tmp_path / 'empty.cap'
+    capture.write_bytes(CAPTURE_MAGIC)
+    communicator = BeckerCommunicator(f"{REPLAY_SCHEME}{capture}")
+    communicator._write_queue.maxsize = 1  # pylint: disable=protected-access
+    with mock.patch.object(communicator, 'is_alive', return_value=True):
+        communicator.send(frame(increment=1))
+        communicator.send(frame(increment=2))
+        communicator.send(frame(increment=3, command=0x10))
+    assert communicator.queue_size == 2
+    assert communicator.metrics.dropped_frames == 1
+
+
+def test_queue_wait_is_measured_at_dequeue(tmp_path):
+    capture = tmp_path / 'empty.cap'
+    capture.write_bytes(CAPTURE_MAGIC)
+    communicator = BeckerCommunicator(f"{REPLAY_SCHEME}{capture}")
+    with mock.patch('pybecker.becker_helper.time.monotonic', return_value=1000.0):
+        communicator._write_queue.put_nowait(frame())  # pylint: disable=protected-access
+    with mock.patch('pybecker.becker_helper.time.monotonic', return_value=1002.5):
+        communicator._process(False)  # pylint: disable=protected-access
+    queue_wait = communicator.metrics.queue_wait.as_dict()
+    assert communicator.metrics.frames_sent == 1
+    assert queue_wait['count'] == 1
+    assert queue_wait['max'] == 2.5
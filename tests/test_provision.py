@@ -0,0 +1,79 @@
+"""Tests of the bulk pairing of several channels."""
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+
+from pybecker.becker import Becker
+from pybecker.becker_helper import MESSAGE
+from pybecker.capture import CAPTURE_MAGIC, REPLAY_SCHEME
+from pybecker.provision import STATUS_INVALID, STATUS_SENT
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Becker replaying an empty capture, sent frames are collected instead of queued."""
+    capture = tmp_path / 'empty.cap'
+    capture.write_bytes(CAPTURE_MAGIC)
+    becker = Becker(
+        device_name=f"{REPLAY_SCHEME}{capture}", db_filename=str(tmp_path / 'centronic-stick.db')
+    )
+    becker.sent = []
+    becker.communicator.send = lambda packet, priority=None: becker.sent.append(packet)
+    yield becker
+    becker.close()
+
+
+def provision(client, channels, **kwargs):
+    """Run provision with a mocked asyncio.sleep, return results and the mock."""
+    with mock.patch('pybecker.becker.asyncio.sleep', new=mock.AsyncMock()) as sleep:
+        results = asyncio.run(client.provision(channels, **kwargs))
+    return results, sleep
+
+
+def sent_frames(client):
+    """Return (unit id, channel, increment) of the sent frames."""
+    return [
+        (match.group('unit_id'), match.group('channel'), int(match.group('increment'), 16))
+        for match in map(MESSAGE.match, client.sent)
+    ]
+
+
+def test_provision_waits_gap_before_each_channel(client):
+    results, sleep = provision(client, ['1:1', '1:2', '2:1'], gap=12)
+    assert sleep.await_args_list == [mock.call(12)] * 3
+    assert {channel: result['status'] for channel, result in results.items()} == {
+        '1:1': STATUS_SENT, '1:2': STATUS_SENT, '2:1': STATUS_SENT,
+    }
+    # increments of each unit are allocated in one block, three frames per channel
+    assert sent_frames(client) == [
+        (b'1737B', b'1', 0), (b'1737B', b'1', 1), (b'1737B', b'1', 2),
+        (b'1737B', b'2', 3), (b'1737B', b'2', 4), (b'1737B', b'2', 5),
+        (b'1737C', b'1', 0), (b'1737C', b'1', 1), (b'1737C', b'1', 2),
+    ]
+    assert client.db.get_unit(1)[1:] == [6, 1]
+    assert client.db.get_unit(2)[1:] == [3, 1]
+
+
+def test_provision_resumes_interrupted_run(client, tmp_path):
+    progress = tmp_path / 'progress.json'
+    progress.write_text(json.dumps({'channels': {'1:1': {'status': STATUS_SENT, 'time': 0}}}))
+    results, sleep = provision(client, ['1:1', '1:2'], gap=5, progress_file=str(progress))
+    assert sleep.await_args_list == [mock.call(5)]
+    assert [frame[1] for frame in sent_frames(client)] == [b'2'] * 3
+    assert json.loads(progress.read_text())['channels'] == results
+    assert set(results) == {'1:1', '1:2'}
+
+
+def test_provision_restart_and_invalid_channels(client, tmp_path):
+    progress = tmp_path / 'progress.json'
+    provision(client, ['1:1'], gap=0, progress_file=str(progress))
+    results, sleep = provision(
+        client, ['1:1', '1:9', '9:1', 'x'], gap=3, progress_file=str(progress), restart=True
+    )
+    assert sleep.await_args_list == [mock.call(3)]
+    assert {channel: result['status'] for channel, result in results.items()} == {
+        '1:1': STATUS_SENT, '1:9': STATUS_INVALID, '9:1': STATUS_INVALID, 'x': STATUS_INVALID,
+    }
+    assert len(client.sent) == 6
@@ -0,0 +1,107 @@
+"""Property based tests of TravelCalculator."""
+from unittest import mock
+
+from hypothesis import given, strategies as st
+
+import travelcalculator
+from travelcalculator import TravelCalculator, TravelCurve
+
+positions = st.integers(min_value=0, max_value=100)
+travel_times = st.floats(min_value=0.5, max_value=120)
+start_delays = st.floats(min_value=0, max_value=2)
+# monotonically increasing curves from 0 to 100
+curves = st.one_of(
+    st.none(),
+    st.lists(st.floats(min_value=0, max_value=100), max_size=8).map(
+        lambda points: TravelCurve([0] + sorted(points) + [100])
+    ),
+)
+# sorted fractions of the travel time at which the position is sampled
+samples = st.lists(st.floats(min_value=0, max_value=1.2), min_size=1, max_size=20).map(sorted)
+
+
+class FakeTime:
+    """Replacement of the time module of travelcalculator with a settable clock."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+def calculator(down, up, curve, delay):
+    return TravelCalculator(down, up, travel_curve=curve, start_delay=delay)
+
+
+@given(positions, travel_times, travel_times, curves, start_delays)
+def test_set_position_round_trip(position, down, up, curve, delay):
+    clock = FakeTime()
+    with mock.patch.object(travelcalculator, "time", clock):
+        calc = calculator(down, up, curve, delay)
+        calc.set_position(position)
+        assert calc.current_position() == position
+        clock.now += 1000
+        assert calc.current_position() == position
+        assert not calc.is_traveling()
+
+
+@given(positions, positions, travel_times, travel_times, curves, start_delays, samples)
+def test_position_is_monotonic(start, target, down, up, curve, delay, fractions):
+    clock = FakeTime()
+    with mock.patch.object(travelcalculator, "time", clock):
+        calc = calculator(down, up, curve, delay)
+        calc.set_position(start)
+        began = clock.now
+        calc.start_travel(target)
+        duration = calc.calculate_travel_time(start, target)
+        step = 1 if target >= start else -1
+        previous = start
+        for fraction in fractions:
+            clock.now = began + duration * fraction
+            position = calc.current_position()
+            # never moves backwards and never leaves the range of the travel
+            assert (position - previous) * step >= 0
+            assert min(start, target) <= position <= max(start, target)
+            previous = position
+        # the position is memoised for one clock tick
+        clock.now = began + duration + travelcalculator.POSITION_TICK
+        assert calc.current_position() == target
+        assert calc.position_reached()
+
+
+@given(positions, positions, travel_times, curves, st.floats(min_value=0, max_value=1))
+def test_travel_state_round_trip(start, target, travel_time, curve, fraction):
+    clock = FakeTime()
+    with mock.patch.object(travelcalculator, "time", clock):
+        calc = calculator(travel_time, travel_time, curve, 0)
+        calc.set_position(start)
+        calc.start_travel(target)
+        clock.now += calc.calculate_travel_time(start, target) * fraction
+        state = calc.travel_state()
+        restored = calculator(travel_time, travel_time, curve, 0)
+        if state is None:
+            assert calc.current_position() == target
+            return
+        restored.restore_travel(*state)
+        assert restored.current_position() == calc.current_position()
+
+
+def test_changed_travel_time_invalidates_cache():
+    clock = FakeTime()
+    with mock.patch.object(travelcalculator, "time", clock):
+        calc = calculator(100, 100, None, 0)
+        calc.set_position(0)
+        calc.start_travel_down()
+        clock.now += 10
+        assert calc.current_position() == 10
+        # same clock tick, the memoised position must not be returned
+        calc.travel_time_down = 20
+        assert calc.current_position() == 50
+        calc.travel_curve = TravelCurve([0, 100])
+        assert calc.current_position() == 50
+        calc.start_delay = 10
+        assert calc.current_position() == 0
@@ -0,0 +1,71 @@
+"""
+Microbenchmark of the TravelCalculator position queries.
+
+A state write of a travelling cover queries the position several times
+(position, is_opening, is_closing, is_closed). The benchmark measures these
+queries with the memoised position of one clock tick and with a clock that
+advances every query, for linear and curved travel.
+
+    python tools/bench_travelcalculator.py --count 200000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import travelcalculator  # pylint: disable=wrong-import-position
+from travelcalculator import POSITION_TICK, TravelCalculator, TravelCurve  # pylint: disable=wrong-import-position
+
+CURVE = [0, 5, 15, 30, 50, 70, 85, 95, 100]
+
+
+def state_write(calc):
+    """Queries of one state write of a cover."""
+    calc.current_position()
+    calc.is_opening()
+    calc.is_closing()
+    calc.is_closed()
+
+
+def bench(count, curve, advance):
+    """Return state writes per second of a travelling cover."""
+    clock = types.SimpleNamespace(now=1000.0)
+    clock.monotonic = lambda: clock.now
+    clock.time = lambda: clock.now
+    travelcalculator.time = clock
+    calc = TravelCalculator(60, 60, travel_curve=curve, start_delay=0.5)
+    calc.set_position(0)
+    calc.start_travel_down()
+    # a long travel, the cover does not arrive during the benchmark
+    calc.travel_time_down = count * POSITION_TICK * 10
+    step = POSITION_TICK if advance else 0.0
+    start = time.perf_counter()
+    for _ in range(count):
+        clock.now += step
+        state_write(calc)
+    return round(count / (time.perf_counter() - start))
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', 1)[0])
+    parser.add_argument('--count', type=int, default=100000, help='State writes per case (default 100000)')
+    args = parser.parse_args()
+
+    curve = TravelCurve(CURVE)
+    report = {
+        'linear_same_tick': bench(args.count, None, advance=False),
+        'linear_every_tick': bench(args.count, None, advance=True),
+        'curve_same_tick': bench(args.count, curve, advance=False),
+        'curve_every_tick': bench(args.count, curve, advance=True),
+    }
+    travelcalculator.time = time
+    print(json.dumps({'state_writes_per_second': report}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,484 @@
+"""
+Fleet simulation of the Becker cover platform without Home Assistant.
+
+Thousands of BeckerEntity objects are driven by simulated remote presses and
+service calls. Home Assistant is replaced by minimal stand-ins, the USB stick
+by an in-memory emulation encoding all frames, and the event loop runs on a
+simulated clock, so that hours of traffic are simulated in seconds. Remote
+presses take the receive path of PyBecker, with batching, event coalescing
+and the events fired on the bus.
+
+The report contains the event loop time per packet and per service call, the
+timers created and the state writes per (simulated) second of the workload.
+
+    python tools/fleet_simulation.py --covers 2000 --duration 600 --presses 20
+"""
+import argparse
+import asyncio
+import collections
+import enum
+import importlib.util
+import json
+import os
+import random
+import selectors
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = 'becker'
+EPOCH = 1700000000.0
+DEVICE = 'simulation'
+
+# remote command: pybecker command code
+REMOTE_COMMANDS = {'up': 0x20, 'down': 0x40, 'halt': 0x10, 'up5': 0x24, 'down5': 0x44}
+
+
+class SimulatedLoop(asyncio.SelectorEventLoop):
+    """Event loop with simulated time, idle time is skipped instead of waited for."""
+
+    def __init__(self):
+        """Init loop at simulated time 0."""
+        super().__init__(selector=SkippingSelector(self))
+        self.now = 0.0
+        self.timers = 0
+
+    def time(self):
+        """Return simulated time."""
+        return self.now
+
+    def call_at(self, when, callback, *args, context=None):
+        """Count created timers."""
+        self.timers += 1
+        return super().call_at(when, callback, *args, context=context)
+
+
+class SkippingSelector(selectors.SelectSelector):
+    """Selector advancing the simulated clock instead of blocking."""
+
+    def __init__(self, loop):
+        """Init selector of loop."""
+        super().__init__()
+        self._loop = loop
+
+    def select(self, timeout=None):
+        """Return ready events without blocking, skip the timeout."""
+        events = super().select(0)
+        if not events and timeout:
+            self._loop.now += timeout
+        return events
+
+
+class SimulatedBus:
+    """Event bus counting the fired events."""
+
+    def __init__(self):
+        """Init bus."""
+        self.events = 0
+
+    def async_fire(self, event_type, event_data=None):
+        """Count event."""
+        self.events += 1
+
+
+class SimulatedHass:
+    """Minimal stand-in for the Home Assistant core."""
+
+    def __init__(self, loop):
+        """Init hass."""
+        self.loop = loop
+        self.bus = SimulatedBus()
+        self.data = {}
+        self.states = {}
+        self.signals = collections.defaultdict(list)
+        self.state_writes = 0
+        self.task_time = 0.0
+
+    def async_create_task(self, target):
+        """Run coroutine as task and account its run time."""
+        return self.loop.create_task(self._timed(target))
+
+    async def _timed(self, target):
+        """Await target and add its run time to task_time."""
+        start = time.perf_counter()
+        try:
+            return await target
+        finally:
+            self.task_time += time.perf_counter() - start
+
+    def write_state(self, entity):
+        """Evaluate the state properties of entity like Home Assistant does."""
+        self.state_writes += 1
+        attributes = dict(entity.extra_state_attributes or {})
+        attributes['current_position'] = entity.current_cover_position
+        attributes['supported_features'] = entity.supported_features
+        if entity.is_opening:
+            state = 'opening'
+        elif entity.is_closing:
+            state = 'closing'
+        else:
+            state = 'closed' if entity.is_closed else 'open'
+        self.states[entity.unique_id] = (state, attributes)
+
+
+def install_stubs():
+    """Install stand-ins for the Home Assistant modules used by the platform."""
+
+    def module(name, **attributes):
+        mod = types.ModuleType(name)
+        mod.__dict__.update(attributes)
+        sys.modules[name] = mod
+        return mod
+
+    def identity(value=None, *args, **kwargs):
+        return value
+
+    class Schema:
+        """Permissive schema, configuration is not validated in the simulation."""
+
+        def __init__(self, *args, **kwargs):
+            self.args = args
+
+        def __call__(self, value):
+            return value
+
+        def extend(self, *args, **kwargs):
+            return Schema(*args)
+
+    class CoverEntityFeature(enum.IntFlag):
+        OPEN = 1
+        CLOSE = 2
+        SET_POSITION = 4
+        STOP = 8
+        OPEN_TILT = 16
+        CLOSE_TILT = 32
+
+    class Entity:
+        hass = None
+
+        def async_on_remove(self, func):
+            pass
+
+        def async_write_ha_state(self):
+            self.hass.write_state(self)
+
+        def async_schedule_update_ha_state(self, force_refresh=False):
+            self.async_write_ha_state()
+
+    class CoverEntity(Entity):
+        pass
+
+    class RestoreEntity(Entity):
+        async def async_get_last_state(self):
+            return None
+
+        async def async_get_last_extra_data(self):
+            return None
+
+    class RestoredExtraData:
+        def __init__(self, data):
+            self._data = data
+
+        def as_dict(self):
+            return self._data
+
+    def async_dispatcher_connect(hass, signal, target):
+        hass.signals[signal].append(target)
+        return lambda: hass.signals[signal].remove(target)
+
+    def async_dispatcher_send(hass, signal, *args):
+        for target in list(hass.signals[signal]):
+            result = target(*args)
+            if asyncio.iscoroutine(result):
+                hass.async_create_task(result)
+
+    def async_track_time_interval(hass, action, interval):
+        handle = None
+
+        def tick():
+            nonlocal handle
+            handle = hass.loop.call_later(interval.total_seconds(), tick)
+            action(None)
+
+        handle = hass.loop.call_later(interval.total_seconds(), tick)
+        return lambda: handle.cancel()
+
+    if 'voluptuous' not in sys.modules:
+        try:
+            import voluptuous  # noqa: F401  pylint: disable=import-outside-toplevel,unused-import
+        except ImportError:
+            module(
+                'voluptuous', Schema=Schema, Optional=identity, Required=identity,
+                All=Schema, Any=Schema, Coerce=Schema, Range=Schema, In=Schema, Match=Schema,
+                Invalid=ValueError,
+            )
+    module('homeassistant')
+    module('homeassistant.components')
+    module(
+        'homeassistant.components.cover',
+        ATTR_CURRENT_POSITION='current_position', ATTR_POSITION='position',
+        PLATFORM_SCHEMA=Schema(), CoverEntity=CoverEntity, CoverEntityFeature=CoverEntityFeature,
+    )
+    module(
+        'homeassistant.const',
+        CONF_COVERS='covers', CONF_DEVICE='device', CONF_FILENAME='filename',
+        CONF_FRIENDLY_NAME='friendly_name', CONF_NAME='name', CONF_VALUE_TEMPLATE='value_template',
+        STATE_CLOSED='closed', STATE_OPEN='open',
+        Platform=types.SimpleNamespace(SENSOR='sensor', COVER='cover'),
+    )
+    module(
+        'homeassistant.core', callback=identity,
+        SupportsResponse=types.SimpleNamespace(OPTIONAL='optional'),
+    )
+    module('homeassistant.exceptions', HomeAssistantError=Exception, TemplateError=Exception)
+    module('homeassistant.helpers')
+    module(
+        'homeassistant.helpers.config_validation', string=str, template=str,
+        positive_float=float, positive_int=int, boolean=bool, ensure_list=identity,
+        schema_with_slug_keys=Schema,
+    )
+    module(
+        'homeassistant.helpers.event', TrackTemplate=None,
+        async_track_template_result=None, async_track_time_interval=async_track_time_interval,
+    )
+    module(
+        'homeassistant.helpers.restore_state', ExtraStoredData=RestoredExtraData,
+        RestoreEntity=RestoreEntity, RestoredExtraData=RestoredExtraData,
+    )
+    module('homeassistant.helpers.discovery', async_load_platform=None)
+    module(
+        'homeassistant.helpers.dispatcher',
+        async_dispatcher_connect=async_dispatcher_connect,
+        async_dispatcher_send=async_dispatcher_send,
+    )
+
+
+def import_component():
+    """Import the component from the repository root as package becker."""
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE, os.path.join(ROOT, '__init__.py'), submodule_search_locations=[ROOT]
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = package
+    spec.loader.exec_module(package)
+    return importlib.import_module(f'{PACKAGE}.cover')
+
+
+class EmulatedBecker:
+    """
+    In-memory replacement of the Becker instance.
+
+    Commands are encoded to complete frames with rolling increments, like
+    they would be sent to the USB stick, and counted.
+    """
+
+    def __init__(self, becker_module, helper, metrics):
+        """Init emulated stick."""
+        self._becker = becker_module
+        self._helper = helper
+        self.metrics = metrics
+        self.units = {}
+        self.frames = 0
+
+    async def send(self, channel, cmd, test=False, priority=None):
+        """Encode the frames of command."""
+        un, ch = self._becker.Becker._split_channel(channel)
+        unit = self.units.setdefault(un, ['%05X' % (0x1737A + un), 0, 1])
+        sequence = self._becker.SEQUENCES.get(cmd) or self._becker.timed_sequence(cmd)
+        for batch in sequence.batches:
+            for command, offset in batch.frames:
+                self._helper.finalize_code(
+                    self._helper.generate_code(ch, (unit[0], unit[1] + offset), command)
+                )
+                self.frames += 1
+        unit[1] += sequence.length
+
+    async def move_up(self, channel):
+        await self.send(channel, 'UP')
+
+    async def move_up_intermediate(self, channel):
+        await self.send(channel, 'UP2')
+
+    async def move_down(self, channel):
+        await self.send(channel, 'DOWN')
+
+    async def move_down_intermediate(self, channel):
+        await self.send(channel, 'DOWN2')
+
+    async def stop(self, channel):
+        await self.send(channel, 'HALT')
+
+
+async def simulate(args, cover, loop):
+    """Create covers, drive the workload and return the report."""
+    from becker.pybecker import becker as becker_module   # pylint: disable=import-outside-toplevel,import-error
+    from becker.pybecker import becker_helper as helper   # pylint: disable=import-outside-toplevel,import-error
+    from becker import rf_device                          # pylint: disable=import-outside-toplevel,import-error
+    from becker.pybecker.metrics import BeckerMetrics, Histogram  # pylint: disable=import-outside-toplevel,import-error
+
+    hass = SimulatedHass(loop)
+    emulated = EmulatedBecker(becker_module, helper, BeckerMetrics())
+    # the receive path of PyBecker with the emulated stick instead of Becker
+    rf_device.Becker = lambda **kwargs: emulated
+    pybecker = rf_device.PyBecker(hass, DEVICE, None, {}, args.coalesce_events)
+    process_time = 0.0
+    process_packets = pybecker.async_process_packets
+
+    def timed_process_packets():
+        """Process batch of packets and account its run time."""
+        nonlocal process_time
+        start = time.perf_counter()
+        try:
+            process_packets()
+        finally:
+            process_time += time.perf_counter() - start
+
+    pybecker.async_process_packets = timed_process_packets
+    scheduler = cover.CoverScheduler(hass)
+    ticker = cover.ProgressTicker(hass, args.progress_interval) if args.progress_interval else None
+
+    entities = []
+    remotes = []
+    for i in range(args.covers):
+        remote = ('%05X' % (0x20000 + i // 7), i % 7 + 1)
+        travel_time = random.uniform(15, 45)
+        entity = cover.BeckerEntity(
+            pybecker, scheduler, f'cover {i}', f'{i // 7 % 5 + 1}:{i % 7 + 1}',
+            None, f'{remote[0]}:{remote[1]}', travel_time, travel_time * 1.1,
+            cover.VENTILATION_POSITION, cover.INTERMEDIATE_POSITION, True,
+            True, False, cover.TILT_TIME, None, 0, ticker,
+        )
+        entity.hass = hass
+        await entity.async_added_to_hass()
+        entities.append(entity)
+        remotes.append(remote)
+
+    packet_time = Histogram()
+    service_time = Histogram()
+    setup_timers = loop.timers
+    driver_timers = 0
+    end = loop.time() + args.duration
+    events = []
+    if args.presses > 0:
+        events.append(('press', loop.time() + random.expovariate(args.presses)))
+    if args.commands > 0:
+        events.append(('command', loop.time() + random.expovariate(args.commands)))
+
+    while events:
+        events.sort(key=lambda event: event[1])
+        kind, due = events.pop(0)
+        if due >= end:
+            continue
+        await asyncio.sleep(due - loop.time())
+        driver_timers += 1
+        index = random.randrange(args.covers)
+        if kind == 'press':
+            unit_id, channel = remotes[index]
+            code = helper.generate_code(
+                channel, (unit_id, random.randrange(0x10000)),
+                REMOTE_COMMANDS[random.choice(list(REMOTE_COMMANDS))],
+            )
+            packet = helper.MESSAGE.search(helper.finalize_code(code))
+            task_time = hass.task_time
+            processed = process_time
+            start = time.perf_counter()
+            # repeated frames of a held button arrive in one batch
+            for _ in range(args.repeats):
+                pybecker.receive_callback(packet)
+            elapsed = time.perf_counter() - start
+            # let the batch and the tasks of the dispatched packet run
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            packet_time.observe(
+                elapsed + process_time - processed + hass.task_time - task_time
+            )
+            events.append(('press', due + random.expovariate(args.presses)))
+        else:
+            entity = entities[index]
+            action = random.choice(('open', 'close', 'stop', 'position'))
+            start = time.perf_counter()
+            if action == 'open':
+                await entity.async_open_cover()
+            elif action == 'close':
+                await entity.async_close_cover()
+            elif action == 'stop':
+                await entity.async_stop_cover()
+            else:
+                await entity.async_set_cover_position(position=random.randrange(101))
+            service_time.observe(time.perf_counter() - start)
+            events.append(('command', due + random.expovariate(args.commands)))
+
+    # rates are measured over the workload only
+    await asyncio.sleep(end - loop.time())
+    driver_timers += 1
+    duration = loop.time()
+    state_writes = hass.state_writes
+    report = {
+        'covers': args.covers,
+        'simulated_duration': round(duration, 3),
+        'packets': packet_time.count,
+        'service_calls': service_time.count,
+        'events_fired': hass.bus.events,
+        'frames_sent': emulated.frames,
+        'loop_time_per_packet': summary(packet_time),
+        'loop_time_per_service_call': summary(service_time),
+        'timers_created': loop.timers - setup_timers - driver_timers,
+        'state_writes': state_writes,
+        'state_writes_per_second': round(state_writes / duration, 3),
+    }
+    # let all covers finish travelling
+    await asyncio.sleep(60)
+    return report
+
+
+def summary(histogram):
+    """Return latency summary of histogram."""
+    result = histogram.as_dict()
+    return {key: result[key] for key in ('avg', 'p50', 'p95', 'p99', 'max')}
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', 1)[0])
+    parser.add_argument('--covers', type=int, default=1000, help='Number of covers (default 1000)')
+    parser.add_argument(
+        '--duration', type=float, default=300, help='Simulated seconds (default 300)'
+    )
+    parser.add_argument(
+        '--presses', type=float, default=10, help='Remote presses per simulated second (default 10)'
+    )
+    parser.add_argument(
+        '--commands', type=float, default=2, help='Service calls per simulated second (default 2)'
+    )
+    parser.add_argument(
+        '--progress-interval', type=float, help='Enable progress updates every given seconds'
+    )
+    parser.add_argument(
+        '--repeats', type=int, default=1, help='Identical frames per remote press (default 1)'
+    )
+    parser.add_argument(
+        '--coalesce-events', action='store_true', help='Fire a single event for repeated frames'
+    )
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random workload (default 0)')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    install_stubs()
+    cover = import_component()
+    loop = SimulatedLoop()
+    # covers and the travel calculator use the simulated clock
+    clock = types.SimpleNamespace(time=lambda: EPOCH + loop.now, monotonic=lambda: loop.now)
+    cover.time = clock
+    sys.modules[f'{PACKAGE}.travelcalculator'].time = clock
+    start = time.perf_counter()
+    try:
+        report = loop.run_until_complete(simulate(args, cover, loop))
+    finally:
+        loop.close()
+    report['real_duration'] = round(time.perf_counter() - start, 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,14 @@ from __future__ import annotations
 from enum import Enum
 import time
 
+# Resolution of the monotonic clock used to memoise the calculated position.
+# All queries within one tick (e.g. during a single HA state write) share the
+# same result.
+POSITION_TICK = 0.01
+
+# Number of steps of the lookup tables of a TravelCurve.
+TRAVEL_CURVE_STEPS = 100
+
 
 class TravelStatus(Enum):
     """Enum class for travel status."""
@@ -25,14 +33,107 @@ class TravelStatus(Enum):
     STOPPED = 3
 
 
+class TravelCurve:
+    """
+    Lookup tables for a cover travelling with non linear speed.
+
+    The curve is given as cover positions (0 is closed, 100 is open), sampled
+    at equally spaced times while the cover travels from closed to open.
+    It is precomputed into two tables, which allow to interpolate position and
+    travel time in constant time.
+    """
+
+    __slots__ = ("_position", "_time")
+
+    def __init__(self, points: list[float]) -> None:
+        """Initialize TravelCurve class."""
+        points = [float(point) for point in points]
+        if len(points) < 2 or points[0] != 0 or points[-1] != 100:
+            raise ValueError("Travel curve must start with 0 and end with 100")
+        if any(nxt < prev for prev, nxt in zip(points, points[1:])):
+            raise ValueError("Travel curve must be monotonically increasing")
+        segments = len(points) - 1
+
+        # position at time fraction i / TRAVEL_CURVE_STEPS
+        self._position: list[float] = []
+        for i in range(TRAVEL_CURVE_STEPS + 1):
+            index, rest = divmod(i * segments / TRAVEL_CURVE_STEPS, 1)
+            index = int(index)
+            if index >= segments:
+                self._position.append(points[-1])
+            else:
+                self._position.append(
+                    points[index] + (points[index + 1] - points[index]) * rest
+                )
+
+        # time fraction when position 100 * i / TRAVEL_CURVE_STEPS is reached
+        self._time: list[float] = []
+        index = 0
+        for i in range(TRAVEL_CURVE_STEPS + 1):
+            position = 100 * i / TRAVEL_CURVE_STEPS
+            while index < segments - 1 and points[index + 1] < position:
+                index += 1
+            span = points[index + 1] - points[index]
+            rest = (position - points[index]) / span if span > 0 else 0.0
+            self._time.append((index + rest) / segments)
+
+    @staticmethod
+    def _lookup(table: list[float], fraction: float) -> float:
+        """Interpolate table at fraction (0.0 - 1.0)."""
+        if fraction <= 0:
+            return table[0]
+        if fraction >= 1:
+            return table[-1]
+        step, rest = divmod(fraction * TRAVEL_CURVE_STEPS, 1)
+        step = int(step)
+        return table[step] + (table[step + 1] - table[step]) * rest
+
+    def position(self, time_fraction: float) -> float:
+        """Return position (0 is closed) at fraction of full travel time."""
+        return self._lookup(self._position, time_fraction)
+
+    def time(self, position: float) -> float:
+        """Return fraction of full travel time to reach position (0 is closed)."""
+        return self._lookup(self._time, position / 100)
+
+
 class TravelCalculator:
     """Class for calculating the current position of a cover."""
 
-    def __init__(self, travel_time_down: float, travel_time_up: float) -> None:
+    __slots__ = (
+        "travel_direction",
+        "_travel_time_down",
+        "_travel_time_up",
+        "_travel_curve",
+        "_start_delay",
+        "_last_known_position",
+        "_last_known_position_timestamp",
+        "_position_confirmed",
+        "_travel_to_position",
+        "_cache_tick",
+        "_cache_position",
+        "position_closed",
+        "position_open",
+    )
+
+    def __init__(
+        self,
+        travel_time_down: float,
+        travel_time_up: float,
+        travel_curve: TravelCurve | None = None,
+        start_delay: float = 0.0,
+    ) -> None:
         """Initialize TravelCalculator class."""
         self.travel_direction = TravelStatus.STOPPED
+        # memoised result of current_position() for one clock tick
+        self._cache_tick: int | None = None
+        self._cache_position: int | None = None
+
         self.travel_time_down = travel_time_down
         self.travel_time_up = travel_time_up
+        # optional non linear travel and motor dead time
+        self.travel_curve = travel_curve
+        self.start_delay = start_delay
 
         self._last_known_position: int | None = None
         self._last_known_position_timestamp: float = 0.0
@@ -43,6 +144,48 @@ class TravelCalculator:
         self.position_closed: int = 100
         self.position_open: int = 0
 
+    # Changing the travel parameters invalidates the memoised position
+
+    @property
+    def travel_time_down(self) -> float:
+        """Return time to travel from open to closed."""
+        return self._travel_time_down
+
+    @travel_time_down.setter
+    def travel_time_down(self, value: float) -> None:
+        self._travel_time_down = value
+        self._cache_tick = None
+
+    @property
+    def travel_time_up(self) -> float:
+        """Return time to travel from closed to open."""
+        return self._travel_time_up
+
+    @travel_time_up.setter
+    def travel_time_up(self, value: float) -> None:
+        self._travel_time_up = value
+        self._cache_tick = None
+
+    @property
+    def travel_curve(self) -> TravelCurve | None:
+        """Return curve of non linear travel, None for linear travel."""
+        return self._travel_curve
+
+    @travel_curve.setter
+    def travel_curve(self, value: TravelCurve | None) -> None:
+        self._travel_curve = value
+        self._cache_tick = None
+
+    @property
+    def start_delay(self) -> float:
+        """Return dead time of the motor before the cover moves."""
+        return self._start_delay
+
+    @start_delay.setter
+    def start_delay(self, value: float) -> None:
+        self._start_delay = value
+        self._cache_tick = None
+
     def set_position(self, position: int) -> None:
         """Set position and target of cover."""
         self._travel_to_position = position
@@ -51,7 +194,8 @@ class TravelCalculator:
     def update_position(self, position: int) -> None:
         """Update known position of cover."""
         self._last_known_position = position
-        self._last_known_position_timestamp = time.time()
+        self._last_known_position_timestamp = time.monotonic()
+        self._cache_tick = None
         if position == self._travel_to_position:
             self._position_confirmed = True
 
@@ -64,6 +208,7 @@ class TravelCalculator:
         self._travel_to_position = stop_position
         self._position_confirmed = False
         self.travel_direction = TravelStatus.STOPPED
+        self._cache_tick = None
 
     def start_travel(self, _travel_to_position: int) -> None:
         """Start traveling to position."""
@@ -71,9 +216,10 @@ class TravelCalculator:
             self.set_position(_travel_to_position)
             return
         self.stop()
-        self._last_known_position_timestamp = time.time()
+        self._last_known_position_timestamp = time.monotonic()
         self._travel_to_position = _travel_to_position
         self._position_confirmed = False
+        self._cache_tick = None
 
         self.travel_direction = (
             TravelStatus.DIRECTION_DOWN
@@ -81,6 +227,34 @@ class TravelCalculator:
             else TravelStatus.DIRECTION_UP
         )
 
+    def travel_state(self) -> tuple | None:
+        """
+        Return state of the travel in progress, None if not traveling.
+
+        The state is (start position, target position, direction, start time),
+        the start time is in seconds since the epoch to survive a restart.
+        """
+        if self.travel_direction == TravelStatus.STOPPED or not self.is_traveling():
+            return None
+        started = time.time() - (time.monotonic() - self._last_known_position_timestamp)
+        return (
+            self._last_known_position,
+            self._travel_to_position,
+            self.travel_direction.value,
+            started,
+        )
+
+    def restore_travel(
+        self, start_position: int, travel_to_position: int, direction: int, started: float
+    ) -> None:
+        """Continue a travel returned by travel_state(), e.g. after a restart."""
+        self._last_known_position = start_position
+        self._last_known_position_timestamp = time.monotonic() - (time.time() - started)
+        self._travel_to_position = travel_to_position
+        self._position_confirmed = False
+        self.travel_direction = TravelStatus(direction)
+        self._cache_tick = None
+
     def start_travel_up(self) -> None:
         """Start traveling up."""
         self.start_travel(self.position_open)
@@ -91,9 +265,14 @@ class TravelCalculator:
 
     def current_position(self) -> int | None:
         """Return current (calculated or known) position."""
-        if not self._position_confirmed:
-            return self._calculate_position()
-        return self._last_known_position
+        if self._position_confirmed:
+            return self._last_known_position
+        now = time.monotonic()
+        tick = int(now / POSITION_TICK)
+        if tick != self._cache_tick:
+            self._cache_position = self._calculate_position(now)
+            self._cache_tick = tick
+        return self._cache_position
 
     def is_traveling(self) -> bool:
         """Return if cover is traveling."""
@@ -102,13 +281,13 @@ class TravelCalculator:
     def is_opening(self) -> bool:
         """Return if the cover is opening."""
         return (
-            self.is_traveling() and self.travel_direction == TravelStatus.DIRECTION_UP
+            self.travel_direction == TravelStatus.DIRECTION_UP and self.is_traveling()
         )
 
     def is_closing(self) -> bool:
         """Return if the cover is closing."""
         return (
-            self.is_traveling() and self.travel_direction == TravelStatus.DIRECTION_DOWN
+            self.travel_direction == TravelStatus.DIRECTION_DOWN and self.is_traveling()
         )
 
     def position_reached(self) -> bool:
@@ -123,8 +302,8 @@ class TravelCalculator:
         """Return if cover is (fully) closed."""
         return self.current_position() == self.position_closed
 
-    def _calculate_position(self) -> int | None:
-        """Return calculated position."""
+    def _calculate_position(self, now: float) -> int | None:
+        """Return calculated position at monotonic time now."""
         if self._travel_to_position is None or self._last_known_position is None:
             return self._last_known_position
         relative_position = self._travel_to_position - self._last_known_position
@@ -150,22 +329,55 @@ class TravelCalculator:
             from_position=self._last_known_position,
             to_position=self._travel_to_position,
         )
-        if time.time() > self._last_known_position_timestamp + remaining_travel_time:
+        elapsed = now - self._last_known_position_timestamp
+        if elapsed >= remaining_travel_time:
             return self._travel_to_position
 
-        progress = (
-            time.time() - self._last_known_position_timestamp
-        ) / remaining_travel_time
-        return int(self._last_known_position + relative_position * progress)
+        # motor did not start moving yet
+        elapsed -= self.start_delay
+        if elapsed <= 0:
+            return self._last_known_position
+
+        if self.travel_curve is None:
+            progress = elapsed / (remaining_travel_time - self.start_delay)
+            return int(self._last_known_position + relative_position * progress)
+
+        if relative_position > 0:
+            time_fraction = -elapsed / self.travel_time_down
+        else:
+            time_fraction = elapsed / self.travel_time_up
+        time_fraction += self.travel_curve.time(
+            self.position_closed - self._last_known_position
+        )
+        position = int(self.position_closed - self.travel_curve.position(time_fraction))
+        # the interpolated tables are no exact inverse, never pass the designated position
+        if relative_position > 0:
+            return min(position, self._travel_to_position)
+        return max(position, self._travel_to_position)
 
     def calculate_travel_time(self, from_position: int, to_position: int) -> float:
         """Calculate time to travel from one position to another."""
         travel_range = to_position - from_position
+        if travel_range == 0:
+            return 0.0
         travel_time_full = (
             self.travel_time_down if travel_range > 0 else self.travel_time_up
         )
-        return travel_time_full * abs(travel_range) / self.position_closed
+        if self.travel_curve is None:
+            travel_share = abs(travel_range) / self.position_closed
+        else:
+            travel_share = abs(
+                self.travel_curve.time(self.position_closed - to_position)
+                - self.travel_curve.time(self.position_closed - from_position)
+            )
+        return self.start_delay + travel_time_full * travel_share
 
     def __eq__(self, other: object | None) -> bool:
         """Equal operator."""
-        return self.__dict__ == other.__dict__
\ No newline at end of file
+        if not isinstance(other, TravelCalculator):
+            return NotImplemented
+        return all(
+            getattr(self, slot) == getattr(other, slot)
+            for slot in self.__slots__
+            if not slot.startswith("_cache")
+        )
\ No newline at end of file